@@ -44,6 +44,10 @@ setup(
         "setuptools",
     ],
     extras_require={
+        "parquet": [
+            # last releases with Python 2.7 support
+            "pyarrow<0.17",
+        ],
         "test": [
             "Products.PloneTestCase",
             "plone.app.testing",
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import collections
+from contextlib import contextmanager
+
+
+class NullMeasure(object):
+    """No-op context manager used when no accounting is active
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_MEASURE = NullMeasure()
+
+
+class LoadAccounting(object):
+    """Counts ZODB object loads, cache hits and loaded bytes of a connection
+
+    The number of loads is taken from the transfer counts of the connection,
+    which are increased every time a ghost is activated from the storage.
+    The loaded bytes are summed up by wrapping the `load` method of the
+    connection storage while the accounting is active.
+
+    Measurements are grouped by name, e.g. per column. A measurement that
+    did not require any object load from the storage is counted as a hit.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.stats = collections.OrderedDict()
+        self.bytes = 0
+        self.active = False
+        self._loads = 0
+        self._storage = None
+        self._wrapped = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        """Start the accounting
+        """
+        if self.active:
+            return
+        self._loads = self.get_load_count()
+        self._storage = storage = getattr(self.connection, "_storage", None)
+        if storage is not None:
+            # remember an already patched method, e.g. of a nested accounting
+            self._wrapped = storage.__dict__.get("load")
+            load = storage.load
+
+            def load_and_count(*args, **kw):
+                result = load(*args, **kw)
+                self.bytes += len(result[0] or "")
+                return result
+
+            storage.load = load_and_count
+        self.active = True
+
+    def stop(self):
+        """Stop the accounting and restore the storage
+        """
+        if not self.active:
+            return
+        storage = self._storage
+        if storage is not None:
+            if self._wrapped is not None:
+                storage.load = self._wrapped
+            else:
+                del storage.load
+        self._loads = self.get_load_count() - self._loads
+        self._storage = None
+        self._wrapped = None
+        self.active = False
+
+    def get_load_count(self):
+        """Returns the current number of loads of the connection
+        """
+        if self.connection is None:
+            return 0
+        return self.connection.getTransferCounts()[0]
+
+    @contextmanager
+    def measure(self, name):
+        """Measure the loads of the wrapped code block
+        """
+        loads = self.get_load_count()
+        size = self.bytes
+        try:
+            yield
+        finally:
+            loads = self.get_load_count() - loads
+            stats = self.stats.setdefault(name, {
+                "calls": 0,
+                "loads": 0,
+                "bytes": 0,
+                "hits": 0,
+            })
+            stats["calls"] += 1
+            stats["loads"] += loads
+            stats["bytes"] += self.bytes - size
+            if loads == 0:
+                stats["hits"] += 1
+
+    @property
+    def loads(self):
+        """Total number of loads
+        """
+        if self.active:
+            return self.get_load_count() - self._loads
+        return self._loads
+
+    def totals(self):
+        """Returns the accumulated counts of all measurements
+        """
+        calls = sum(map(lambda s: s["calls"], self.stats.values()))
+        hits = sum(map(lambda s: s["hits"], self.stats.values()))
+        return {
+            "loads": self.loads,
+            "bytes": self.bytes,
+            "calls": calls,
+            "hits": hits,
+            "hit_rate": float(hits) / calls if calls else 0.0,
+        }
+
+    def to_dict(self, labels=None):
+        """Returns the accounting as a dictionary
+
+        :param labels: mapping of measurement names to display labels
+        """
+        labels = labels or {}
+        measurements = []
+        for name, stats in self.stats.items():
+            info = dict(stats, name=name, label=labels.get(name, name))
+            measurements.append(info)
+        data = self.totals()
+        data["measurements"] = measurements
+        return data
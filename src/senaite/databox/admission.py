@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Admission control for expensive databox executions
+
+Limits the number of concurrent executions per instance and per user.
+Requests over capacity wait in a bounded queue for a free slot and are
+rejected when the queue is full or the wait times out.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from bika.lims import api
+from senaite.databox.config import EXPORT_RETRY_AFTER
+from senaite.databox.utils import get_setting
+
+
+class Admission(object):
+    """Counts the running executions of a process
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.active = 0
+        self.waiting = 0
+        self.users = {}
+
+    def has_capacity(self, user, max_active, max_per_user):
+        """Checks if another execution of the user can be started
+        """
+        if max_active and self.active >= max_active:
+            return False
+        if max_per_user and self.users.get(user, 0) >= max_per_user:
+            return False
+        return True
+
+    def acquire(self, user, max_active=0, max_per_user=0, queue_size=0,
+                timeout=0):
+        """Acquire a slot for an execution of the user
+
+        :param user: ID of the user
+        :param max_active: maximum concurrent executions, 0 for no limit
+        :param max_per_user: maximum concurrent executions of a user
+        :param queue_size: maximum number of waiting requests
+        :param timeout: maximum seconds to wait for a free slot
+        :returns: True if the execution was admitted
+        """
+        with self.condition:
+            if not self.has_capacity(user, max_active, max_per_user):
+                if self.waiting >= queue_size:
+                    return False
+                self.waiting += 1
+                try:
+                    deadline = time.time() + timeout
+                    while not self.has_capacity(
+                            user, max_active, max_per_user):
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            return False
+                        self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.users[user] = self.users.get(user, 0) + 1
+            return True
+
+    def release(self, user):
+        """Release the slot of an execution of the user
+        """
+        with self.condition:
+            self.active -= 1
+            self.users[user] -= 1
+            if not self.users[user]:
+                del self.users[user]
+            self.condition.notify_all()
+
+    @contextmanager
+    def admit(self, user, **limits):
+        """Context manager that yields if the execution was admitted
+        """
+        admitted = self.acquire(user, **limits)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release(user)
+
+
+# Running databox exports of this process
+exports = Admission()
+
+
+def admit_export():
+    """Acquire a slot for an export of the current user
+
+    Returns a context manager that yields if the export was admitted.
+    """
+    user = api.get_current_user().getId()
+    return exports.admit(
+        user,
+        max_active=get_setting("databox_export_max_concurrent", 2),
+        max_per_user=get_setting("databox_export_max_per_user", 1),
+        queue_size=get_setting("databox_export_queue_size", 2),
+        timeout=get_setting("databox_export_queue_timeout", 5.0))
+
+
+def reject_export(response):
+    """Respond that the export can not be started right now
+    """
+    response.setStatus(503)
+    response.setHeader("Retry-After", str(EXPORT_RETRY_AFTER))
+    response.setHeader("Content-Type", "text/plain")
+    return "Too many databox exports are running, please try again later"
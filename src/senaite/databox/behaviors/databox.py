@@ -185,6 +185,46 @@ class IDataBoxBehavior(model.Schema):
         required=False,
     )
 
+    directives.omitted(IAddForm, "max_rows")
+    max_rows = schema.Int(
+        title=_(u"label_max_rows", default=u"Maximum rows"),
+        description=_(u"Stop the execution after the number of rows. "
+                      u"The site-wide limit applies if not set"),
+        default=0,
+        min=0,
+        required=False,
+    )
+
+    directives.omitted(IAddForm, "max_seconds")
+    max_seconds = schema.Int(
+        title=_(u"label_max_seconds", default=u"Maximum seconds"),
+        description=_(u"Stop the execution after the number of seconds. "
+                      u"The site-wide limit applies if not set"),
+        default=0,
+        min=0,
+        required=False,
+    )
+
+    directives.omitted(IAddForm, "max_loads")
+    max_loads = schema.Int(
+        title=_(u"label_max_loads", default=u"Maximum object loads"),
+        description=_(u"Stop the execution after the number of objects "
+                      u"loaded from the database. "
+                      u"The site-wide limit applies if not set"),
+        default=0,
+        min=0,
+        required=False,
+    )
+
+    directives.omitted(IAddForm, "materialized")
+    materialized = schema.Bool(
+        title=_(u"label_materialized", default=u"Materialized"),
+        description=_(u"Keep a snapshot of the extracted rows that is "
+                      u"updated when the queried objects change"),
+        default=False,
+        required=False,
+    )
+
 
 @implementer(IDataBoxBehavior)
 @adapter(IDexterityContent)
@@ -201,7 +241,8 @@ class DataBox(object):
         """
         query = {"portal_type": self.query_type}
         if self.limit:
-            query["limit"] = self.limit
+            # let the catalog only sort the top N results
+            query["sort_limit"] = self.limit
         if self.sort_on:
             query["sort_on"] = self.sort_on
         if self.sort_order:
@@ -221,6 +262,26 @@ class DataBox(object):
         logger.info("DataBox Query: {}".format(query))
         return query
 
+    def get_delta_query(self, since):
+        """Catalog query for the objects modified since the given date
+
+        :param since: DateTime of the last delta query (watermark)
+        :returns: catalog query with a `modified` range restriction
+        """
+        query = self.query
+        query.pop("sort_limit", None)
+        modified = query.get("modified")
+        if isinstance(modified, dict) and modified.get("range") == "minmax":
+            # the databox date range is already on the modified index
+            date_from, date_to = modified["query"]
+            query["modified"] = {
+                "query": (max(date_from, since), date_to),
+                "range": "minmax",
+            }
+        else:
+            query["modified"] = {"query": since, "range": "min"}
+        return query
+
     @property
     def render_params(self):
         """Databox params
@@ -488,3 +549,39 @@ class DataBox(object):
         return getattr(self.context, "sort_reversed", False)
 
     sort_reversed = property(_get_sort_reversed, _set_sort_reversed)
+
+    # MATERIALIZED
+
+    def _set_materialized(self, value):
+        self.context.materialized = value
+
+    def _get_materialized(self):
+        return getattr(self.context, "materialized", False)
+
+    materialized = property(_get_materialized, _set_materialized)
+
+    # BUDGETS
+
+    def _set_max_rows(self, value):
+        self.context.max_rows = value
+
+    def _get_max_rows(self):
+        return getattr(self.context, "max_rows", 0)
+
+    max_rows = property(_get_max_rows, _set_max_rows)
+
+    def _set_max_seconds(self, value):
+        self.context.max_seconds = value
+
+    def _get_max_seconds(self):
+        return getattr(self.context, "max_seconds", 0)
+
+    max_seconds = property(_get_max_seconds, _set_max_seconds)
+
+    def _set_max_loads(self, value):
+        self.context.max_loads = value
+
+    def _get_max_loads(self):
+        return getattr(self.context, "max_loads", 0)
+
+    max_loads = property(_get_max_loads, _set_max_loads)
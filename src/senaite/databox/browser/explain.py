@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from bika.lims import api
+from bika.lims.browser import BrowserView
+from Products.Five.browser.pagetemplatefile import ViewPageTemplateFile
+from senaite.databox import explain
+from senaite.databox.behaviors.databox import IDataBoxBehavior
+
+
+class ExplainView(BrowserView):
+    """Shows how the catalog executes the databox query
+    """
+    template = ViewPageTemplateFile("templates/explain.pt")
+
+    def __init__(self, context, request):
+        super(ExplainView, self).__init__(context, request)
+        self.databox = IDataBoxBehavior(self.context)
+        self.explanation = None
+
+    def __call__(self):
+        catalog = self.databox.get_catalog_tool()
+        self.explanation = explain.explain(catalog, self.databox.query)
+        return self.template()
+
+    def get_indexes(self):
+        """Returns the index measurements for the template
+        """
+        indexes = []
+        for num, index in enumerate(self.explanation["indexes"], 1):
+            info = dict(index)
+            info.update({
+                "position": num,
+                "selectivity": "{:.1%}".format(index["selectivity"]),
+                "duration": self.format_duration(index["duration"]),
+            })
+            indexes.append(info)
+        return indexes
+
+    def get_sort(self):
+        """Returns the sort measurement for the template
+        """
+        sort = self.explanation["sort"]
+        if not sort:
+            return None
+        info = dict(sort)
+        info["duration"] = self.format_duration(sort["duration"])
+        return info
+
+    def get_hint(self):
+        return self.explanation["hint"]
+
+    def format_duration(self, duration):
+        """Format the duration in milliseconds
+        """
+        return "{:.2f} ms".format(duration * 1000)
+
+    def get_databox_url(self):
+        return api.get_url(self.context)
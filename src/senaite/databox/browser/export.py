@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+import re
+import six
+import sys
+
+from bika.lims import api
+from bika.lims.browser import BrowserView
+from openpyxl import Workbook
+from openpyxl.writer.excel import save_virtual_workbook
+from senaite.databox import admission
+from senaite.databox import logger
+from senaite.databox import sqlite
+from senaite.databox import streaming
+
+# Maximum length of the worksheet titles in Excel
+MAX_SHEET_TITLE_LENGTH = 31
+
+# File of the zip archive with the reasons of the truncated exports
+TRUNCATED_FILENAME = u"TRUNCATED.txt"
+
+
+class ExportView(BrowserView):
+    """Base view to export several databoxes of the folder
+
+    The `uids` request parameter contains the UIDs of the databoxes to
+    export, otherwise all databoxes of the folder are exported.
+
+    The default export is a zip archive with a CSV file of every databox,
+    which is compressed and streamed to the response while the rows are
+    extracted. Subclasses export other formats by overriding `export`
+    together with the file extension and the content type.
+    """
+
+    # File extension and content type of the exported file
+    extension = "zip"
+    content_type = "application/zip"
+
+    def __call__(self):
+        with admission.admit_export() as admitted:
+            if not admitted:
+                logger.warn("Rejected export of {} for user {}"
+                            .format(api.get_path(self.context),
+                                    api.get_current_user().getId()))
+                return admission.reject_export(self.request.response)
+            return self.export()
+
+    def export(self):
+        """Stream the zip archive to the response
+        """
+        self.set_download_headers(self.get_filename(), self.content_type)
+        output = streaming.Output(self.request.response)
+        self.write_zip(output)
+        output.drain()
+
+    def download(self, data):
+        """Write the exported file as a whole to the response
+        """
+        self.set_download_headers(self.get_filename(), self.content_type)
+        response = self.request.response
+        response.setHeader("Content-Length", len(data))
+        response.write(data)
+
+    def get_filename(self):
+        """Returns the file name of the export
+        """
+        return "{}.{}".format(self.context.Title(), self.extension)
+
+    def set_download_headers(self, filename, type):
+        """Set the headers of the downloaded file
+        """
+        response = self.request.response
+        response.setHeader("Content-Disposition",
+                           "attachment; filename={}".format(filename))
+        response.setHeader("Content-Type", type)
+        response.setHeader("Cache-Control", "no-store")
+        response.setHeader("Pragma", "no-cache")
+
+    def get_list(self, key):
+        """Returns the list of values of the request parameter
+        """
+        value = self.request.form.get(key, [])
+        if isinstance(value, six.string_types):
+            value = [value]
+        return filter(None, value)
+
+    def get_databoxes(self):
+        """Returns the databoxes to export
+        """
+        # N.B. the databoxes are dexterity items without an own meta type
+        databoxes = filter(
+            lambda obj: api.get_portal_type(obj) == "DataBox",
+            self.context.objectValues())
+        uids = self.get_list("uids")
+        if uids:
+            databoxes = filter(lambda obj: api.get_uid(obj) in uids, databoxes)
+        return filter(
+            lambda obj: api.security.check_permission("View", obj), databoxes)
+
+    def get_databox_view(self, databox):
+        """Returns the view of the databox to fetch all rows
+        """
+        view = api.get_view("view", context=databox, request=self.request)
+        view.pagesize = sys.maxint
+        return view
+
+    def get_filenames(self, databoxes):
+        """Returns unique file names of the databoxes in the archive
+        """
+        titles = map(lambda obj: obj.Title(), databoxes)
+        names = sqlite.get_names(titles, default=u"databox")
+        return map(lambda name: u"{}.csv".format(name), names)
+
+    def write_zip(self, output):
+        """Write the zip archive to the output
+
+        :param output: `senaite.databox.streaming.Output`
+        """
+        archive = streaming.ZipWriter(output.write)
+        databoxes = self.get_databoxes()
+        truncated = []
+        for databox, filename in zip(databoxes, self.get_filenames(databoxes)):
+            view = self.get_databox_view(databox)
+            # the view writes the archive to the response while it exports
+            view.output = output
+            entry = archive.open(filename)
+            with view.execution("csv"):
+                view.check_row_budget()
+                view.write_csv(entry)
+            entry.close()
+            output.drain()
+            if view.truncated:
+                truncated.append(u"{}: {}".format(filename, view.truncated))
+        if truncated:
+            # the response headers were sent with the first file already
+            entry = archive.open(TRUNCATED_FILENAME)
+            entry.write(u"\n".join(truncated).encode("utf8") + "\n")
+            entry.close()
+        archive.close()
+
+
+class ExcelExportView(ExportView):
+    """Exports the databoxes of the folder into one workbook
+
+    Every databox is written into its own worksheet. The databoxes share the
+    models of their objects and references within the request.
+    """
+
+    extension = "xlsx"
+    content_type = "application/vnd.ms-excel"
+
+    def export(self):
+        self.download(self.get_excel())
+
+    def get_sheet_titles(self, databoxes):
+        """Returns unique and valid worksheet titles of the databoxes
+        """
+        titles = []
+        for databox in databoxes:
+            title = api.safe_unicode(databox.Title())
+            # Excel does not allow these characters in worksheet titles
+            title = re.sub(r"[\\/*?:\[\]]", u"", title) or u"DataBox"
+            title = title[:MAX_SHEET_TITLE_LENGTH]
+            unique = title
+            num = 1
+            while unique.lower() in map(lambda t: t.lower(), titles):
+                num += 1
+                suffix = u" ({})".format(num)
+                unique = title[:MAX_SHEET_TITLE_LENGTH - len(suffix)] + suffix
+            titles.append(unique)
+        return titles
+
+    def get_excel(self):
+        """Returns the workbook with a worksheet for each databox
+        """
+        workbook = Workbook()
+        databoxes = self.get_databoxes()
+        titles = self.get_sheet_titles(databoxes)
+        for num, (databox, title) in enumerate(zip(databoxes, titles)):
+            view = self.get_databox_view(databox)
+            # the new workbook contains already an empty worksheet
+            sheet = workbook.active if num == 0 else workbook.create_sheet()
+            sheet.title = title
+            with view.execution("excel"):
+                view.write_sheet(sheet)
+        return save_virtual_workbook(workbook)
+
+
+class SQLiteExportView(ExportView):
+    """Exports the databoxes of the folder into one SQLite database
+
+    The `index` request parameter contains the titles of the columns to
+    index.
+    """
+
+    extension = "sqlite"
+    content_type = "application/vnd.sqlite3"
+
+    def export(self):
+        self.download(self.get_sqlite())
+
+    def get_sqlite(self):
+        """Returns the SQLite database with a table for each databox
+        """
+        tables = []
+        for databox in self.get_databoxes():
+            view = self.get_databox_view(databox)
+            with view.execution("sqlite"):
+                tables.append((databox.Title(), view.get_typed_columns()))
+        return sqlite.to_sqlite(tables, indexes=self.get_list("index"))
@@ -20,12 +20,17 @@
 
 import collections
 
-from bika.lims import api
 from bika.lims import senaiteMessageFactory as _
 from bika.lims.utils import get_link
+from plone.memoize import view
 from senaite.app.listing.view import ListingView
+from senaite.core.api import dtime
+from senaite.databox import stats
 from senaite.databox.permissions import AddDataBox
 
+# Columns of the execution statistics of the databoxes
+STATS_COLUMNS = ["last_run", "duration", "rows", "loads", "hit_rate"]
+
 
 class DataBoxFolderView(ListingView):
     """The DataBox Folder View
@@ -67,23 +72,60 @@ class DataBoxFolderView(ListingView):
             ("query_type", {
                 "title": _("Type"),
                 "index": "query_type"}),
+            # execution statistics are sorted manually
+            ("last_run", {
+                "title": _("Last Run")}),
+            ("duration", {
+                "title": _("Duration")}),
+            ("rows", {
+                "title": _("Rows")}),
+            ("loads", {
+                "title": _("Objects Loaded")}),
+            ("hit_rate", {
+                "title": _("Cache Hit Rate")}),
         ))
 
+        # export the selected databoxes into one workbook
+        export_excel = {
+            "id": "export_excel",
+            "title": _("Export Excel"),
+            "url": "export_to_excel",
+        }
+
+        # export the selected databoxes into one SQLite database
+        export_sqlite = {
+            "id": "export_sqlite",
+            "title": _("Export SQLite"),
+            "url": "export_to_sqlite",
+        }
+
+        # export the selected databoxes as CSV files of a zip archive
+        export_zip = {
+            "id": "export_zip",
+            "title": _("Export ZIP"),
+            "url": "export_to_zip",
+        }
+
+        exports = [export_excel, export_sqlite, export_zip]
+
         self.review_states = [
             {
                 "id": "default",
                 "title": _("Active"),
                 "contentFilter": {"is_active": True},
+                "custom_transitions": exports,
                 "columns": self.columns.keys(),
             }, {
                 "id": "inactive",
                 "title": _("Inactive"),
                 "contentFilter": {'is_active': False},
+                "custom_transitions": exports,
                 "columns": self.columns.keys(),
             }, {
                 "id": "all",
                 "title": _("All"),
                 "contentFilter": {},
+                "custom_transitions": exports,
                 "columns": self.columns.keys(),
             },
         ]
@@ -98,11 +140,47 @@ class DataBoxFolderView(ListingView):
         """
         super(DataBoxFolderView, self).before_render()
 
+    @view.memoize
+    def get_execution_stats(self):
+        """Returns the execution statistics of the databoxes by UID
+        """
+        return stats.get_stats(self.context)
+
+    def sort_brains(self, brains, sort_on=None, instance_fallback=True):
+        """Sort the brains by the execution statistics of the databoxes
+        """
+        if sort_on not in STATS_COLUMNS:
+            return super(DataBoxFolderView, self).sort_brains(
+                brains, sort_on=sort_on, instance_fallback=instance_fallback)
+        execution_stats = self.get_execution_stats()
+
+        def get_key(brain):
+            value = execution_stats.get(brain.UID, {}).get(sort_on)
+            # databoxes without statistics come first
+            return value is not None, value
+
+        reverse = self.get_sort_order() == "descending"
+        return sorted(brains, key=get_key, reverse=reverse)
+
     def folderitem(self, obj, item, index):
-        obj = api.get_object(obj)
-        url = api.get_url(obj)
-        title = api.get_title(obj)
+        """Render the databox from the catalog brain only
+        """
+        url = obj.getURL()
+        title = obj.Title
         item["replace"]["Title"] = get_link(
             url, value=title)
-        item["query_type"] = getattr(obj, "query_type", None)
+        item["query_type"] = obj.query_type or None
+
+        info = self.get_execution_stats().get(obj.UID)
+        if info:
+            last_run = info["last_run"]
+            item["last_run"] = last_run.ISO8601()
+            item["replace"]["last_run"] = dtime.to_localized_time(
+                last_run, long_format=True)
+            item["duration"] = info["duration"]
+            item["replace"]["duration"] = "{:.2f} s".format(info["duration"])
+            item["rows"] = info["rows"]
+            item["loads"] = info["loads"]
+            item["hit_rate"] = info["hit_rate"]
+            item["replace"]["hit_rate"] = "{:.0%}".format(info["hit_rate"])
         return item
@@ -78,6 +78,9 @@ class FormController(BrowserView):
     def _process_form_value(self, key, value):
         """Process the form value for the databox
         """
+        if key in ["max_rows", "max_seconds", "max_loads"]:
+            return api.to_int(value, 0)
+
         if key in ["date_from", "date_to"]:
             if value:
                 return parser.parse(value)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from bika.lims import api
+from bika.lims.browser import BrowserView
+from plone.protect import PostOnly
+from plone.protect import protect
+from Products.Five.browser.pagetemplatefile import ViewPageTemplateFile
+from senaite.databox import slowlog
+
+
+class SlowLogView(BrowserView):
+    """Lists the slow databox executions of the folder sorted by cost
+    """
+    template = ViewPageTemplateFile("templates/slowlog.pt")
+
+    def __call__(self):
+        if self.request.form.get("form.button.clear", False):
+            self.handle_clear(REQUEST=self.request)
+            return self.request.response.redirect(
+                "{}/@@slow_log".format(api.get_url(self.context)))
+        return self.template()
+
+    @protect(PostOnly)
+    def handle_clear(self, REQUEST=None):
+        slowlog.clear(self.context)
+
+    def get_records(self):
+        """Returns the slow log records for the template
+        """
+        records = []
+        for record in slowlog.get_records(self.context):
+            timings = record.get("timings", {})
+            records.append({
+                "title": record.get("title"),
+                "url": self.request.physicalPathToURL(record.get("path")),
+                "uid": record.get("uid"),
+                "execution": record.get("execution"),
+                "truncated": record.get("truncated"),
+                "date": api.to_date(record.get("date")),
+                "user": record.get("user"),
+                "duration": "{:.2f}".format(record.get("duration", 0)),
+                "rows": record.get("rows"),
+                "columns": record.get("columns"),
+                "query": repr(record.get("query")),
+                "timings": ", ".join(map(
+                    lambda item: "{}: {:.2f}s".format(*item),
+                    sorted(timings.items()))),
+            })
+        return records
@@ -22,36 +22,69 @@ import ast
 import collections
 import copy
 import csv
+import json
 import math
 import StringIO
 import six
 import sys
+import time
 
+from contextlib import contextmanager
 from functools import cmp_to_key
+from functools import partial
 
+from Acquisition import aq_base
 from bika.lims import api
 from bika.lims import bikaMessageFactory as _
 from DateTime import DateTime
 from openpyxl import Workbook
 from openpyxl.writer.excel import save_virtual_workbook
+from plone.memoize import instance
+from plone.memoize import ram
 from plone.memoize import view
 from plone.protect.interfaces import IDisableCSRFProtection
 from Products.Five.browser.pagetemplatefile import ViewPageTemplateFile
+from Products.statusmessages.interfaces import IStatusMessage
 from senaite.app.listing.view import ListingView
 from senaite.app.supermodel.model import SuperModel
 from senaite.core.api import dtime
+from senaite.databox import admission
+from senaite.databox import budget
+from senaite.databox import columnar
+from senaite.databox import datatypes
+from senaite.databox import dates
+from senaite.databox import delta
 from senaite.databox import logger
+from senaite.databox import models
+from senaite.databox import parallel
+from senaite.databox import pipeline
+from senaite.databox import prefetch
+from senaite.databox import singleflight
+from senaite.databox import slowlog
+from senaite.databox import snapshot
+from senaite.databox import stats
+from senaite.databox import sqlite
+from senaite.databox import streaming
+from senaite.databox.accounting import NULL_MEASURE
+from senaite.databox.accounting import LoadAccounting
 from senaite.databox.behaviors.databox import IDataBoxBehavior
+from senaite.databox.budget import BudgetExceeded
+from senaite.databox.config import DELTA_WATERMARK_OVERLAP
+from senaite.databox.config import PARALLEL_SHARD_SIZE
+from senaite.databox.config import PREFETCH_BATCH_SIZE
+from senaite.databox.config import RESULTS_CACHE_SIZE
 from senaite.databox.converters import convert_to
+from senaite.databox.converters import get_batch_converter
+from senaite.databox.interfaces import IBatchFieldConverter
 from senaite.databox.interfaces import IFieldConverter
 from senaite.databox.permissions import ManageDataBox
+from senaite.databox.utils import get_setting
 from z3c.form.interfaces import DISPLAY_MODE
 from z3c.form.interfaces import IDataConverter
 from z3c.form.interfaces import IFieldWidget
 from zope.component import getMultiAdapter
 from zope.component import getUtilitiesFor
 from zope.component import getUtility
-from zope.component import queryUtility
 from zope.interface import alsoProvides
 from zope.schema.interfaces import IField
 from zope.schema.interfaces import IVocabularyFactory
@@ -114,6 +147,8 @@ class DataBoxView(ListingView):
         super(DataBoxView, self).__init__(context, request)
         self.contentFilter = self.databox.query
         self.pagesize = self.databox.limit
+        self.results_cache_size = RESULTS_CACHE_SIZE
+        self._result_uids = None
         self.context_actions = {}
         self.title = self.context.Title()
         self.description = self.context.Description()
@@ -130,6 +165,32 @@ class DataBoxView(ListingView):
             }
         ]
         self.parameters = collections.OrderedDict()
+        # ZODB load accounting, see `account_loads`
+        self.accounting = None
+        # execution tracking, see `execution`
+        self.timings = collections.OrderedDict()
+        self.rows = 0
+        self._execution = None
+        # number of catalog results without the sort limit
+        self.result_count = None
+        # execution budget, see `execution`
+        self.budget = None
+        self.truncated = None
+        self.processed = []
+        # raw rows of an identical execution, see `folderitems`
+        self.shared_rows = None
+        # watermark of delta queries, see `get_delta`
+        self.delta_since = None
+        self.delta_indexed = True
+        # writer thread of the export rows, see `write_rows`
+        self.pipeline = None
+        # streamed output of the export, see `stream`
+        self.output = None
+        # share the models of the objects with the views of the request
+        self.share_models = True
+        self._model_cache = None
+        # memoized ISO formats of the exported dates
+        self.iso_dates = dates.DateFormatter(dates.ISO_FORMAT)
 
     def update(self):
         super(DataBoxView, self).update()
@@ -164,28 +225,201 @@ class DataBoxView(ListingView):
     def export_to_csv(self):
         """Action handler export to CSV
         """
-        self.pagesize = sys.maxint
-        filename = "{}.csv".format(self.context.Title())
-        data = self.get_csv()
-        return self.download(data, filename)
+        with self.admit_export() as admitted:
+            if not admitted:
+                return self.reject_export()
+            self.pagesize = sys.maxint
+            filename = "{}.csv".format(self.context.Title())
+            with self.stream(filename) as output:
+                with self.execution("csv"):
+                    self.check_row_budget()
+                    self.write_csv(output)
+
+    def export_to_ndjson(self):
+        """Action handler export to newline delimited JSON
+        """
+        with self.admit_export() as admitted:
+            if not admitted:
+                return self.reject_export()
+            self.pagesize = sys.maxint
+            filename = "{}.ndjson".format(self.context.Title())
+            with self.stream(filename, type="application/x-ndjson") as output:
+                with self.execution("ndjson"):
+                    self.check_row_budget()
+                    self.write_ndjson(output)
 
     def export_to_excel(self):
         """Action handler export to Excel
         """
-        self.pagesize = sys.maxint
-        filename = "{}.xlsx".format(self.context.Title())
-        data = self.get_excel()
-        return self.download(data, filename, type="application/vnd.ms-excel")
+        with self.admit_export() as admitted:
+            if not admitted:
+                return self.reject_export()
+            self.pagesize = sys.maxint
+            filename = "{}.xlsx".format(self.context.Title())
+            data = self.get_excel()
+            return self.download(
+                data, filename, type="application/vnd.ms-excel")
+
+    def export_to_parquet(self):
+        """Action handler export to Parquet
+        """
+        if not columnar.HAS_PYARROW:
+            self.request.response.setStatus(501)
+            return "The Parquet export needs the pyarrow package"
+        with self.admit_export() as admitted:
+            if not admitted:
+                return self.reject_export()
+            self.pagesize = sys.maxint
+            filename = "{}.parquet".format(self.context.Title())
+            data = self.get_parquet()
+            return self.download(
+                data, filename, type="application/vnd.apache.parquet")
+
+    def export_to_sqlite(self):
+        """Action handler export to a SQLite database
+
+        The `index` request parameter contains the titles of the columns to
+        index.
+        """
+        with self.admit_export() as admitted:
+            if not admitted:
+                return self.reject_export()
+            self.pagesize = sys.maxint
+            filename = "{}.sqlite".format(self.context.Title())
+            indexes = self.request.form.get("index", [])
+            if isinstance(indexes, six.string_types):
+                indexes = [indexes]
+            data = self.get_sqlite(indexes=indexes)
+            return self.download(
+                data, filename, type="application/vnd.sqlite3")
+
+    def admit_export(self):
+        """Acquire a slot for an export of the current user
+
+        Returns a context manager that yields if the export was admitted.
+        """
+        return admission.admit_export()
 
-    def get_rows(self, header=True):
+    def reject_export(self):
+        """Respond that the export can not be started right now
+        """
+        logger.warn("Rejected export of {} for user {}: too many exports"
+                    .format(api.get_path(self.context),
+                            api.get_current_user().getId()))
+        return admission.reject_export(self.request.response)
+
+    def get_rows(self, header=True, typed=False):
         """Extract the rows from the folderitems
         """
         self.inflate_params()
         if header:
-            yield map(lambda v: v.get("title"), self.columns.values())
-        keys = self.columns.keys()
+            yield self.get_header()
+        convert = self.to_values if typed else self.to_strings
         for item in self.folderitems():
-            yield map(lambda key: self.to_string(item.get(key)), keys)
+            yield convert(item)
+
+    def get_header(self):
+        """Returns the column titles
+        """
+        return map(lambda v: v.get("title"), self.columns.values())
+
+    def to_strings(self, item):
+        """Convert the column values of the item to strings
+        """
+        return map(lambda key: self.to_string(item.get(key)),
+                   self.columns.keys())
+
+    def to_values(self, item):
+        """Convert the column values of the item to typed plain values
+        """
+        return map(lambda key: datatypes.to_plain(item.get(key)),
+                   self.columns.keys())
+
+    def write_rows(self, write, header=True, typed=False):
+        """Write the rows in batches with the given function
+
+        The rows are written in a writer thread, while the objects of the
+        next rows are loaded. Listings with subscriber adapters are written
+        serially, because the adapters modify the rows afterwards.
+
+        :param write: function that writes a list of rows
+        :param header: write the column titles as first row
+        :param typed: write typed plain values instead of strings
+        """
+        if self.get_listing_view_adapters():
+            for row in self.get_rows(header=header, typed=typed):
+                write([row])
+                self.drain_output()
+            return
+        if header:
+            write([self.get_header()])
+        if self.use_parallel_export():
+            return self.write_rows_parallel(write, typed=typed)
+        self.inflate_params()
+        convert = self.to_values if typed else self.to_strings
+        try:
+            with pipeline.Pipeline(write, convert=convert,
+                                   flushed=self.drain_output) as self.pipeline:
+                self.folderitems()
+            self.timings["write"] = self.pipeline.duration
+        finally:
+            self.pipeline = None
+
+    def use_parallel_export(self):
+        """Checks if the rows are extracted by parallel workers
+        """
+        if get_setting("databox_export_workers", 0) < 2:
+            return False
+        if self.get_searchterm() or self.delta_since is not None:
+            return False
+        if self.snapshot_rows is not None:
+            # the rows of the snapshot are not extracted from the objects
+            return False
+        return len(self.get_result_uids()) > PARALLEL_SHARD_SIZE
+
+    def write_rows_parallel(self, write, typed=False):
+        """Write the rows extracted by parallel workers
+
+        Every worker extracts the rows of consecutive results with its own
+        database connection. The rows are written in the sort order.
+        """
+        uids = self.get_result_uids()
+        max_rows = self.budget.max_rows if self.budget else 0
+        if max_rows and len(uids) > max_rows:
+            self.truncate(str(BudgetExceeded("rows", max_rows, len(uids))))
+            uids = uids[:max_rows]
+        self.total = len(uids)
+        workers = get_setting("databox_export_workers", 0)
+        func = partial(DataBoxView.get_shard_rows, typed=typed)
+        shards = parallel.extract(
+            self.context, self.request, uids, func, workers,
+            budget=self.budget)
+        try:
+            for rows in shards:
+                write(rows)
+                self.rows += len(rows)
+                self.drain_output()
+        except BudgetExceeded as exc:
+            # the rows of the previous shards are written already
+            self.truncate(str(exc))
+
+    def get_shard_rows(self, uids, typed=False):
+        """Returns the rows of the given UIDs as strings or typed values
+
+        Called by the workers of a parallel export.
+        """
+        self.inflate_params()
+        references = self.get_reference_fields()
+        convert = self.to_values if typed else self.to_strings
+        rows = []
+        for brains in parallel.get_shards(
+                self.get_page_brains(uids), PREFETCH_BATCH_SIZE):
+            # the columns of a batch are converted at once
+            prefetch.prefetch_brains(brains, references)
+            for brain, row in zip(brains, self.get_rows_of(brains)):
+                item = self.folderitem_columns(brain, {"replace": {}}, row=row)
+                rows.append(convert(item))
+        return rows
 
     def to_string(self, value):
         """Convert value to string
@@ -193,7 +427,7 @@ class DataBoxView(ListingView):
         if isinstance(value, six.string_types):
             return value
         elif isinstance(value, DateTime):
-            return value.ISO()
+            return self.iso_dates(value)
         return str(value)
 
     def get_csv(self, delimiter=",", quotechar='"',
@@ -201,29 +435,109 @@ class DataBoxView(ListingView):
         """Export databox to CSV
         """
         csvfile = StringIO.StringIO()
-        writer = csv.writer(csvfile,
+        with self.execution("csv"):
+            self.write_csv(csvfile,
+                           delimiter=delimiter,
+                           quotechar=quotechar,
+                           quoting=quoting,
+                           dialect=dialect)
+
+            with self.timed("serialize"):
+                return csvfile.getvalue()
+
+    def write_csv(self, output, delimiter=",", quotechar='"',
+                  quoting=csv.QUOTE_ALL, dialect=csv.excel):
+        """Write the databox as CSV into the file-like output
+        """
+        writer = csv.writer(output,
                             delimiter=delimiter,
                             quotechar=quotechar,
                             quoting=quoting,
                             dialect=dialect)
 
+        def to_utf8(s):
+            return api.safe_unicode(s).encode("utf8")
+
+        def write(rows):
+            for row in rows:
+                writer.writerow(map(to_utf8, row))
+
         # write the rows as CSV
-        for row in self.get_rows():
-            def to_utf8(s):
-                return api.safe_unicode(s).encode("utf8")
-            writer.writerow(map(to_utf8, row))
+        self.write_rows(write)
+
+    def get_ndjson(self):
+        """Export databox to newline delimited JSON
+        """
+        output = StringIO.StringIO()
+        with self.execution("ndjson"):
+            self.write_ndjson(output)
+            return output.getvalue()
 
-        return csvfile.getvalue()
+    def write_ndjson(self, output):
+        """Write the rows as JSON objects per line into the file-like output
+        """
+        keys = self.get_header()
+
+        def write(rows):
+            # native JSON types with the time zone info of the dates
+            for row in datatypes.cast_rows(rows, tz=None):
+                record = collections.OrderedDict(zip(keys, row))
+                output.write(json.dumps(
+                    record, default=datatypes.to_json) + "\n")
+
+        self.write_rows(write, header=False, typed=True)
 
     def get_excel(self):
         """Export databox to Excel
         """
-        workbook = Workbook()
-        first_sheet = workbook.get_active_sheet()
-        first_sheet.title = api.safe_unicode(self.context.Title())
-        for row in self.get_rows():
-            first_sheet.append(row)
-        return save_virtual_workbook(workbook)
+        with self.execution("excel"):
+            workbook = Workbook()
+            first_sheet = workbook.get_active_sheet()
+            first_sheet.title = api.safe_unicode(self.context.Title())
+            self.write_sheet(first_sheet)
+            with self.timed("serialize"):
+                return save_virtual_workbook(workbook)
+
+    def write_sheet(self, sheet):
+        """Write the column titles and the rows into the worksheet
+        """
+        sheet.append(self.get_header())
+
+        def write(rows):
+            # native cells in the local time of the dates and numbers only if
+            # Excel keeps them exactly
+            for row in datatypes.cast_rows(
+                    rows, tz=datatypes.LOCAL, digits=datatypes.EXCEL_DIGITS):
+                sheet.append(row)
+
+        self.write_rows(write, header=False, typed=True)
+
+    def get_parquet(self):
+        """Export databox to Parquet with typed columns
+        """
+        with self.execution("parquet"):
+            columns = self.get_typed_columns()
+            with self.timed("serialize"):
+                return columnar.to_parquet(columns)
+
+    def get_sqlite(self, indexes=None):
+        """Export databox to a SQLite database with a typed table
+
+        :param indexes: titles of the columns to index
+        """
+        with self.execution("sqlite"):
+            tables = [(self.context.Title(), self.get_typed_columns())]
+            with self.timed("serialize"):
+                return sqlite.to_sqlite(tables, indexes=indexes)
+
+    def get_typed_columns(self):
+        """Returns the typed values of the rows column-wise
+
+        The types of the columns are inferred once for the whole export.
+        """
+        columns = datatypes.Columns(self.get_header())
+        self.write_rows(columns.append, header=False, typed=True)
+        return columns
 
     def download(self, data, filename, type="text/csv"):
         response = self.request.response
@@ -235,6 +549,262 @@ class DataBoxView(ListingView):
         response.setHeader("Pragma", "no-cache")
         response.write(data)
 
+    @contextmanager
+    def stream(self, filename, type="text/csv"):
+        """Stream the data written to the yielded output to the response
+
+        The data is gzip compressed on the fly if the client accepts it.
+        """
+        response = self.request.response
+        response.setHeader("Content-Disposition",
+                           "attachment; filename={}".format(filename))
+        response.setHeader("Content-Type", "{}; charset=utf-8".format(type))
+        response.setHeader("Cache-Control", "no-store")
+        response.setHeader("Pragma", "no-cache")
+        response.setHeader("Vary", "Accept-Encoding")
+        self.output = streaming.Output(response)
+        output = self.output
+        if streaming.accepts_gzip(self.request):
+            response.setHeader("Content-Encoding", "gzip")
+            output = streaming.GzipWriter(self.output.write)
+        try:
+            yield output
+            output.close()
+            self.output.drain()
+        finally:
+            self.output = None
+
+    def drain_output(self):
+        """Write the output of a running stream to the response
+        """
+        if self.output is not None:
+            self.output.drain()
+
+    @contextmanager
+    def execution(self, name):
+        """Track the runtime of a databox execution
+
+        Nested executions, e.g. the folderitems of an export, are accounted
+        to the outermost execution.
+        """
+        if self._execution is not None:
+            yield
+            return
+        self._execution = name
+        self.timings = collections.OrderedDict()
+        self.rows = 0
+        self.truncated = None
+        self.budget = budget.get_budget(self.context)
+        self.budget.start()
+        counters = self.get_counters()
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timings["total"] = time.time() - start
+            self._execution = None
+            self.log_execution(name)
+            self.record_stats(name, counters)
+
+    @contextmanager
+    def timed(self, stage):
+        """Accumulate the runtime of the wrapped code in the given stage
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start
+            self.timings[stage] = self.timings.get(stage, 0) + duration
+
+    def log_execution(self, name):
+        """Record the execution in the slow log if it exceeds a threshold
+        """
+        duration = self.timings.get("total", 0)
+        if not self.truncated and not slowlog.is_slow(duration, self.rows):
+            return
+        timings = dict(map(
+            lambda item: (item[0], round(item[1], 4)), self.timings.items()))
+        slowlog.record(
+            self.context,
+            execution=name,
+            query=dict(self.contentFilter),
+            columns=len(self.columns),
+            rows=self.rows,
+            duration=duration,
+            timings=timings,
+            truncated=self.truncated)
+
+    def get_counters(self):
+        """Returns the object loads and the model cache hits and misses
+        """
+        jar = self.context._p_jar
+        loads = jar.getTransferCounts()[0] if jar is not None else 0
+        return loads, self.model_cache.hits, self.model_cache.misses
+
+    def record_stats(self, name, counters):
+        """Record the statistics of the execution for the databox folder
+
+        :param name: the name of the execution
+        :param counters: the counters at the start of the execution
+        """
+        if not stats.is_enabled():
+            return
+        loads, hits, misses = map(
+            lambda pair: pair[0] - pair[1], zip(self.get_counters(), counters))
+        lookups = hits + misses
+        stats.record(
+            self.context,
+            execution=name,
+            duration=self.timings.get("total", 0),
+            rows=self.rows,
+            loads=loads,
+            hit_rate=float(hits) / lookups if lookups else 0.0)
+
+    @contextmanager
+    def account_loads(self):
+        """Count the ZODB object loads of the wrapped execution
+        """
+        self.accounting = LoadAccounting(self.context._p_jar)
+        try:
+            with self.accounting:
+                yield self.accounting
+        finally:
+            logger.info("DataBox load accounting for {}: {}".format(
+                repr(self.context), self.accounting.totals()))
+
+    def measure(self, name):
+        """Returns a context manager to measure the loads of a stage
+        """
+        if self.accounting is None:
+            return NULL_MEASURE
+        return self.accounting.measure(name)
+
+    def get_load_accounting(self):
+        """Returns the load accounting report of the last execution
+        """
+        if self.accounting is None:
+            return {}
+        labels = dict(map(
+            lambda item: (item[0], item[1].get("title") or item[0]),
+            self.columns.items()))
+        return self.accounting.to_dict(labels=labels)
+
+    def load_accounting(self):
+        """Action handler to execute the databox with load accounting
+
+        The `export` request parameter allows to account for the `csv` or
+        `excel` exports instead of the listing folderitems.
+        """
+        export = self.request.form.get("export")
+        with self.account_loads():
+            if export == "csv":
+                self.pagesize = sys.maxint
+                self.get_csv()
+            elif export == "excel":
+                self.pagesize = sys.maxint
+                self.get_excel()
+            else:
+                self.folderitems()
+        data = self.get_load_accounting()
+        data["export"] = export or "folderitems"
+        data["rows"] = self.total
+        self.request.response.setHeader("Content-Type", "application/json")
+        return json.dumps(data)
+
+    def export_delta(self):
+        """Action handler to export the rows changed since a watermark
+
+        The `since` request parameter is the watermark returned by the
+        previous delta export. Without watermark all rows are returned.
+        """
+        since = self.request.form.get("since")
+        response = self.request.response
+        response.setHeader("Content-Type", "application/json")
+        if since:
+            since = dtime.to_DT(since)
+            if since is None:
+                response.setStatus(400)
+                return json.dumps({"error": "Invalid watermark"})
+        else:
+            since = None
+        with self.admit_export() as admitted:
+            if not admitted:
+                return self.reject_export()
+            return json.dumps(
+                self.get_delta(since), default=datatypes.to_json)
+
+    def get_delta(self, since):
+        """Returns the rows of the objects changed since the given date
+
+        Objects that were deleted or no longer match the query since the
+        date are reported as deleted. The returned watermark is the `since`
+        value for the next delta query. Deltas that are stopped by the budget
+        are not complete and keep the watermark.
+
+        :param since: DateTime of the watermark or None for all rows
+        :returns: dictionary with the rows, deleted UIDs and new watermark
+        """
+        watermark = DateTime() - DELTA_WATERMARK_OVERLAP / 86400.0
+        query_type = self.databox.query_type
+        complete = delta.is_complete(query_type, since)
+        if since is None:
+            since = DateTime(0)
+        catalog = api.get_tool(self.catalog)
+        self.delta_since = since
+        self.delta_indexed = "modified" in catalog.indexes()
+        self.contentFilter = self.databox.get_delta_query(since)
+        self.pagesize = sys.maxint
+
+        with self.execution("delta"):
+            items = self.folderitems()
+        # native JSON types of the values
+        values = datatypes.cast_rows(map(self.to_values, items), tz=None)
+        rows = map(lambda item, row: {"uid": item["uid"], "values": row},
+                   items, values)
+
+        deleted = set(delta.get_deletions(query_type, since))
+        if self.truncated:
+            # the changed objects that were not processed are not deleted
+            return {
+                "since": since.ISO8601(),
+                "watermark": since.ISO8601(),
+                "complete": False,
+                "truncated": self.truncated,
+                "columns": map(
+                    lambda c: c.get("title"), self.columns.values()),
+                "rows": rows,
+                "deleted": sorted(deleted),
+            }
+        if self.delta_indexed:
+            # changed objects that no longer match the databox query
+            uids = set(map(lambda row: row["uid"], rows))
+            changed = catalog({
+                "portal_type": query_type,
+                "modified": {"query": since, "range": "min"},
+            })
+            deleted.update(filter(
+                lambda uid: uid not in uids, map(api.get_uid, changed)))
+
+        return {
+            "since": since.ISO8601(),
+            "watermark": watermark.ISO8601(),
+            "complete": complete,
+            "columns": map(lambda c: c.get("title"), self.columns.values()),
+            "rows": rows,
+            "deleted": sorted(deleted),
+        }
+
+    def isItemAllowed(self, obj):
+        """Skip the objects modified before the delta watermark
+
+        This is only needed when the catalog has no `modified` index.
+        """
+        if self.delta_since is None or self.delta_indexed:
+            return super(DataBoxView, self).isItemAllowed(obj)
+        obj = api.get_object(obj)
+        return api.get_modification_date(obj) >= self.delta_since
+
     def build_params(self):
         """ Returns ready for evaluation list of parameters
         """
@@ -472,7 +1042,11 @@ class DataBoxView(ListingView):
         """Get all available converter utilities
         """
         converters = [{"name": "", "description": ""}]
-        utilities = getUtilitiesFor(IFieldConverter)
+        utilities = list(getUtilitiesFor(IBatchFieldConverter))
+        names = map(lambda utility: utility[0], utilities)
+        # single value converters are adapted to batch converters
+        utilities.extend(filter(lambda utility: utility[0] not in names,
+                                getUtilitiesFor(IFieldConverter)))
         for utility in utilities:
             name, component = utility
             converters.append({
@@ -598,6 +1172,7 @@ class DataBoxView(ListingView):
         for ref in refs:
             value = model.get(ref)
             if isinstance(value, SuperModel):
+                value = self.model_cache.get_model(value)
                 model = self.resolve_reference_model(value, refs[1:])
         return model
 
@@ -614,9 +1189,296 @@ class DataBoxView(ListingView):
         except Exception as exc:
             return repr(exc)
 
+    def get_catalog_query(self, searchterm=None):
+        """Return the catalog query with the sort limit of the current page
+
+        The catalog only needs to sort the results up to the last item of the
+        current page. Exports, searches, manually sorted and filtered results
+        fetch the complete results.
+        """
+        query = super(DataBoxView, self).get_catalog_query(
+            searchterm=searchterm)
+        query.pop("sort_limit", None)
+        if searchterm or self.manual_sort_on or self.filters_items():
+            return query
+        if self.pagesize < sys.maxint:
+            query["sort_limit"] = self.limit_from + self.pagesize
+        elif self.budget is not None and self.budget.max_rows:
+            # the rows exceeding the budget are not processed anyhow
+            query["sort_limit"] = self.budget.max_rows + 1
+        return query
+
+    def filters_items(self):
+        """Checks if `isItemAllowed` skips results of the catalog query
+
+        Filtered results are fetched completely, so that the number of
+        results is the number of the allowed results.
+        """
+        return self.delta_since is not None and not self.delta_indexed
+
+    def search(self, searchterm="", ignorecase=True):
+        with self.timed("query"):
+            if searchterm:
+                return super(DataBoxView, self).search(
+                    searchterm=searchterm, ignorecase=ignorecase)
+            query = self.get_catalog_query()
+            catalog = api.get_tool(self.catalog)
+            brains = catalog(query)
+            if "sort_limit" in query:
+                # remember the number of results without the sort limit,
+                # results with a sort limit are never filtered
+                self.result_count = getattr(
+                    brains, "actual_result_count", len(brains))
+            if self.manual_sort_on:
+                # the sort column is not a catalog index
+                brains = self.sort_brains(brains, sort_on=self.manual_sort_on)
+            return filter(lambda brain: self.isItemAllowed(brain), brains)
+
+    def use_cached_results(self):
+        """Checks if the page can be rendered from the cached results
+        """
+        if self.get_searchterm():
+            return False
+        if self.pagesize == sys.maxint:
+            # exports fetch the complete results in one go
+            return False
+        if self.filters_items():
+            return False
+        return get_setting("databox_cache_results", True)
+
+    def _results_cache_key(method, self):
+        catalog = api.get_tool(self.catalog)
+        return self.get_results_key() + (
+            self.results_cache_size, catalog.getCounter())
+
+    @ram.cache(_results_cache_key)
+    def get_cached_results(self):
+        """Returns the UIDs of the first results and the number of results
+
+        Only the top results up to the results cache size are sorted and
+        kept, because every change of the catalog resolves the results again.
+
+        :returns: tuple of the UIDs in the sort order and the total
+        """
+        with self.timed("query"):
+            size = self.results_cache_size
+            query = self.get_catalog_query()
+            query.pop("sort_limit", None)
+            if not self.manual_sort_on:
+                query["sort_limit"] = size
+            catalog = api.get_tool(self.catalog)
+            brains = catalog(query)
+            total = getattr(brains, "actual_result_count", len(brains))
+            if self.manual_sort_on:
+                brains = self.sort_brains(brains, sort_on=self.manual_sort_on)
+            brains = brains[:size]
+            allowed = filter(self.isItemAllowed, brains)
+            total -= len(brains) - len(allowed)
+            return tuple(map(api.get_uid, allowed)), total
+
+    def get_result_uids(self):
+        """Returns the UIDs of all results in the order of the catalog query
+        """
+        if self._result_uids is not None:
+            return self._result_uids
+        with self.timed("query"):
+            query = self.get_catalog_query()
+            query.pop("sort_limit", None)
+            catalog = api.get_tool(self.catalog)
+            brains = catalog(query)
+            if self.manual_sort_on:
+                brains = self.sort_brains(brains, sort_on=self.manual_sort_on)
+            brains = filter(self.isItemAllowed, brains)
+            self._result_uids = tuple(map(api.get_uid, brains))
+            return self._result_uids
+
+    def get_page_brains(self, uids):
+        """Returns the brains of the given UIDs in the given order
+        """
+        if not uids:
+            return []
+        with self.timed("query"):
+            catalog = api.get_tool(self.catalog)
+            brains = dict(map(
+                lambda brain: (api.get_uid(brain), brain),
+                catalog(UID=list(uids))))
+            return filter(None, map(brains.get, uids))
+
+    def _fetch_brains(self, idxfrom=0):
+        self.result_count = None
+        uids, total = None, 0
+        if self.use_cached_results():
+            uids, total = self.get_cached_results()
+            if len(uids) < min(idxfrom + self.pagesize, total):
+                # the page is beyond the cached results
+                uids = None
+        if uids is not None:
+            self.total = total
+            brains = self.get_page_brains(
+                uids[idxfrom:idxfrom + self.pagesize])
+        else:
+            brains = super(DataBoxView, self)._fetch_brains(idxfrom=idxfrom)
+            if self.result_count is not None:
+                self.total = self.result_count
+        if self.snapshot_rows is not None or self.shared_rows:
+            # the stored rows do not need the objects
+            return brains
+        return prefetch.iter_prefetched(
+            brains, references=self.get_reference_fields())
+
+    def get_reference_fields(self):
+        """Returns the field names of the reference columns
+        """
+        columns = filter(lambda c: c.get("refs"), self.columns.values())
+        return map(lambda c: c.get("column"), columns)
+
     def folderitems(self):
+        with self.execution("view"):
+            timeout = get_setting("databox_singleflight_timeout", 30.0)
+            exclusive = (self.accounting is not None or
+                         self.pipeline is not None)
+            if timeout and not exclusive and self.snapshot_rows is None:
+                # wait for identical executions in other threads
+                self.shared_rows = singleflight.flights.do(
+                    self.get_flight_key(), self.compute_shared_rows,
+                    timeout=timeout)
+            items, self.total, self.show_more, truncated = \
+                self.compute_folderitems()
+            if truncated:
+                self.truncate(truncated)
+            return items
+
+    def compute_folderitems(self):
+        """Returns the folderitems, the total, the show more flag and the
+        reason why the execution was truncated
+        """
+        with self.timed("params"):
+            self.inflate_params()
+        self.processed = []
+        truncated = None
+        try:
+            items = super(DataBoxView, self).folderitems()
+        except BudgetExceeded as exc:
+            # return the rows processed so far
+            items = list(self.processed)
+            self.show_more = False
+            truncated = str(exc)
+        return items, self.total, self.show_more, truncated
+
+    def compute_shared_rows(self):
+        """Returns the raw rows of the current page by UID
+
+        The rows contain the values before conversion and the UIDs of the
+        converter contexts, like the rows of the snapshot. Every execution
+        fetches its own catalog results and converts the rows, so that the
+        rows can be shared with executions of other users.
+        """
+        with self.timed("params"):
+            self.inflate_params()
+        rows = {}
+        try:
+            for brain in self._fetch_brains(self.limit_from):
+                if self.budget is not None:
+                    self.budget.check(len(rows))
+                with self.timed("rows"):
+                    rows[api.get_uid(brain)] = snapshot.make_row(
+                        self.get_row_cells(brain))
+        except BudgetExceeded:
+            # the execution truncates the missing rows on its own
+            pass
+        return rows
+
+    def check_row_budget(self):
+        """Flag the truncation of an export with more results than rows in the
+        budget
+
+        Streamed exports send the response headers with the first rows, so
+        that the truncation must be flagged before the rows are written.
+        """
+        max_rows = self.budget.max_rows if self.budget else 0
+        if not max_rows:
+            return
+        count = self.get_result_count()
+        if count > max_rows:
+            self.truncate(str(BudgetExceeded("Row", max_rows, count)))
+
+    def get_result_count(self):
+        """Returns the number of allowed results
+
+        The objects are only fetched if the results are filtered.
+        """
         self.inflate_params()
-        return super(DataBoxView, self).folderitems()
+        searchterm = self.get_searchterm()
+        if searchterm or self.filters_items():
+            return len(self.search(searchterm=searchterm))
+        with self.timed("query"):
+            query = self.get_catalog_query()
+            query["sort_limit"] = 1
+            catalog = api.get_tool(self.catalog)
+            brains = catalog(query)
+            return getattr(brains, "actual_result_count", len(brains))
+
+    def truncate(self, reason):
+        """Notify that the execution was stopped by the budget
+
+        Only the first reason is reported, e.g. when the truncation was
+        already flagged before a streamed export.
+        """
+        if self.truncated is not None:
+            return
+        self.truncated = reason
+        logger.warn("Truncated execution of {}: {}".format(
+            api.get_path(self.context), reason))
+        message = _("The execution of the databox was stopped: ${reason}. "
+                    "The result is incomplete.", mapping={"reason": reason})
+        IStatusMessage(self.request).addStatusMessage(message, "warning")
+        self.request.response.setHeader("X-DataBox-Truncated", reason)
+
+    def get_flight_key(self):
+        """Returns the key of identical executions of this databox
+
+        The key is built from the query and the columns only, because the
+        shared rows are filtered by the catalog results and converted for
+        every execution.
+        """
+        return (
+            api.get_uid(self.context),
+            snapshot.get_query_key(self.context),
+            snapshot.get_config_key(self.context),
+            self.get_sort_on(),
+            self.get_sort_order(),
+            self.get_searchterm(),
+            repr(self.delta_since),
+            self.limit_from,
+            self.pagesize,
+        )
+
+    def get_results_key(self):
+        """Returns the key of identical results of this databox
+
+        The key is built from the query inputs only, so that changes of the
+        columns keep the results. Results are only identical for users that
+        see the same catalog results, therefore the allowed roles and users
+        are part of the key.
+        """
+        catalog = api.get_tool(self.catalog)
+        user = api.get_current_user()
+        roles = catalog._listAllowedRolesAndUsers(user)
+        # N.B. the user token only makes a difference if local roles are
+        #      granted to the user on any of the cataloged objects
+        index = catalog._catalog.getIndex("allowedRolesAndUsers")
+        token = "user:{}".format(user.getId())
+        if token not in index._index:
+            roles = filter(lambda role: role != token, roles)
+        return (
+            api.get_uid(self.context),
+            snapshot.get_query_key(self.context),
+            self.get_sort_on(),
+            self.get_sort_order(),
+            self.get_searchterm(),
+            repr(self.delta_since),
+            tuple(sorted(roles)),
+        )
 
     def folderitem(self, obj, item, index):
         """Applies new properties to the item being rendered in the list
@@ -630,48 +1492,224 @@ class DataBoxView(ListingView):
         :return: the dict representation of the item
         :rtype: dict
         """
-        brain = obj
-        obj = api.get_object(obj)
+        if self.budget is not None:
+            self.budget.check(self.rows)
+        with self.timed("rows"):
+            self.rows += 1
+            item = self.folderitem_columns(obj, item)
+        if self.pipeline is not None:
+            # the row is written by the pipeline and not kept in memory
+            self.pipeline.put(item)
+            return None
+        self.processed.append(item)
+        return item
 
-        for column, config in self.columns.items():
-            key = config.get("column")
+    def folderitem_columns(self, brain, item, row=None):
+        """Set the values of the databox columns to the item
 
-            model = SuperModel(obj)
-            if key == "Parent":
-                value = SuperModel(api.get_parent(obj))
-            elif key == "Result" and getattr(obj, "getFormattedResult", None):
-                value = obj.getFormattedResult()
+        :param row: the already extracted row of the brain or None
+        """
+        if row is None:
+            cells = self.get_stored_cells(api.get_uid(brain))
+            if cells is not None:
+                row = self.get_snapshot_row(brain, cells)
+        if row is None:
+            row = self.get_row(brain)
+
+        for column, (value, converted) in zip(self.columns.keys(), row):
+            if converted is not None:
+                item["replace"][column] = converted
+            item[column] = value
+        return item
+
+    @property
+    def model_cache(self):
+        """Returns the models shared by the databoxes of the request
+        """
+        if self._model_cache is None:
+            if self.share_models:
+                self._model_cache = models.get_cache(self.request)
             else:
-                value = model.get(key)
+                self._model_cache = models.ModelCache()
+        return self._model_cache
 
-            # Handle reference columns
-            if isinstance(value, SuperModel):
-                # reference columns are stored in the column config
-                refs = config.get("refs", [DEFAULT_REF])
-                # resolve the referenced model
-                model = self.resolve_reference_model(value, refs)
-                # get the last selected reference column
-                ref = refs[-1]
-                # get the referenced value
-                value = model.get(ref)
-
-            if callable(value):
-                value = value()
-
-            code = config.get("code")
-            if code:
-                # use the referenced instance as the context
-                context = model.instance
-                # execute the code
-                value = self.execute_code(
-                    code, obj=obj, context=context, model=model, brain=brain)
-
-            converter = config.get("converter")
-            if converter:
-                func = queryUtility(IFieldConverter, name=converter)
-                if callable(func):
-                    converted_value = func(model.instance, column, value)
-                    item["replace"][column] = converted_value
+    @property
+    @instance.memoize
+    def snapshot_rows(self):
+        """Returns the materialized rows of the databox or None
 
-            item[column] = value
-        return item
+        Stale snapshots are rebuilt in a separate transaction, the rows of
+        this request are extracted from the objects.
+        """
+        rows = snapshot.get_rows(self.context)
+        if rows is None and snapshot.is_stale(self.context):
+            snapshot.rebuild(self.context)
+        return rows
+
+    def get_stored_cells(self, uid):
+        """Returns the raw cells of the snapshot or the shared execution
+        """
+        for rows in (self.snapshot_rows, self.shared_rows):
+            if rows is not None and uid in rows:
+                return rows[uid]
+        return None
+
+    def get_row(self, brain, obj=None):
+        """Returns the value and converted value of all columns
+
+        :param brain: the catalog brain of the row
+        :param obj: the content object of the row
+        :returns: list of (value, converted value) tuples in column order
+        """
+        return self.get_rows_of([brain], objs=[obj])[0]
+
+    def get_rows_of(self, brains, objs=None):
+        """Returns the rows of the brains with the columns converted at once
+
+        :param brains: the catalog brains of the rows
+        :param objs: the content objects of the rows or None
+        :returns: list of rows with (value, converted value) tuples
+        """
+        if objs is None:
+            objs = [None] * len(brains)
+        cells = map(lambda pair: self.get_row_cells(*pair), zip(brains, objs))
+        return self.convert_cells(cells)
+
+    def convert_cells(self, cells):
+        """Convert the cells of the rows column by column
+
+        :param cells: list of rows with (value, context, brain) tuples
+        :returns: list of rows with (value, converted value) tuples
+        """
+        columns = []
+        for num, (column, convert) in enumerate(
+                zip(self.columns.keys(), self.get_column_converters())):
+            values = map(lambda row: row[num][0], cells)
+            converted = [None] * len(cells)
+            if convert is not None:
+                contexts = map(lambda row: row[num][1], cells)
+                brains = map(lambda row: row[num][2], cells)
+                with self.measure(column):
+                    converted = convert(contexts, values, brains=brains)
+            columns.append(zip(values, converted))
+        return map(list, zip(*columns))
+
+    def get_row_cells(self, brain, obj=None):
+        """Returns the value and the converter context of all columns
+
+        :param brain: the catalog brain of the row
+        :param obj: the content object of the row
+        :returns: list of (value, context, brain) tuples in column order,
+                  the brain is only set if the context is the row object
+        """
+        with self.measure("object"):
+            if obj is None:
+                obj = api.get_object(brain)
+            # N.B. the model deactivates the wrapped object when it is garbage
+            #      collected, therefore we keep one model for the whole row to
+            #      avoid reloading the object for every column. The models are
+            #      shared with the other databoxes of the request.
+            row_model = self.model_cache.get_model(obj)
+
+        row = []
+        for column, config in self.columns.items():
+            with self.measure(column):
+                value, context = self.get_column_value(
+                    column, config, obj, brain, row_model)
+            # the URLs of the row object can be built from the catalog path
+            same = aq_base(context) is aq_base(obj)
+            row.append((value, context, brain if same else None))
+        return row
+
+    def get_snapshot_row(self, brain, cells):
+        """Returns the row of the brain from the stored cells
+
+        The snapshot and shared executions only contain the raw values, the
+        converters and the code of the columns are run for the current
+        request, because they might depend on the current user or time.
+
+        :param brain: the catalog brain of the row
+        :param cells: stored (value, context UID) tuples of the row
+        :returns: list of (value, converted value) tuples in column order
+        """
+        obj = None
+        row = []
+        for (column, config), (value, uid), convert in zip(
+                self.columns.items(), cells, self.get_column_converters()):
+            if config.get("code"):
+                if obj is None:
+                    obj = api.get_object(brain)
+                    row_model = self.model_cache.get_model(obj)
+                value, context = self.get_column_value(
+                    column, config, obj, brain, row_model)
+                same = aq_base(context) is aq_base(obj)
+                row.append((value, context, brain if same else None))
+            elif uid and convert is not None:
+                # referenced objects are only loaded for their converters
+                context = self.model_cache.get_model(uid).instance
+                row.append((value, context, None))
+            else:
+                row.append((value, None, brain))
+        return self.convert_cells([row])[0]
+
+    @view.memoize
+    def get_column_converters(self):
+        """Returns the batch conversion function of each column
+
+        The converters are looked up and set up once per column.
+
+        :returns: list of conversion functions or None in column order
+        """
+        converters = []
+        for column, config in self.columns.items():
+            converter = get_batch_converter(config.get("converter") or "")
+            if converter is None:
+                converters.append(None)
+                continue
+            converters.append(converter(column))
+        return converters
+
+    def get_column_value(self, column, config, obj, brain, model):
+        """Returns the value of the column and the context to convert it
+
+        :param column: the column ID
+        :param config: the column config
+        :param obj: the content object of the row
+        :param brain: the catalog brain of the row
+        :param model: SuperModel of the content object
+        :returns: tuple of value and the object that is passed to the
+                  converter of the column
+        """
+        key = config.get("column")
+
+        if key == "Parent":
+            value = self.model_cache.get_model(api.get_parent(obj))
+        elif key == "Result" and getattr(obj, "getFormattedResult", None):
+            value = obj.getFormattedResult()
+        else:
+            value = model.get(key)
+
+        # Handle reference columns
+        if isinstance(value, SuperModel):
+            value = self.model_cache.get_model(value)
+            # reference columns are stored in the column config
+            refs = config.get("refs", [DEFAULT_REF])
+            # resolve the referenced model
+            model = self.resolve_reference_model(value, refs)
+            # get the last selected reference column
+            ref = refs[-1]
+            # get the referenced value
+            value = model.get(ref)
+
+        if callable(value):
+            value = value()
+
+        code = config.get("code")
+        if code:
+            # use the referenced instance as the context
+            context = model.instance
+            # execute the code
+            value = self.execute_code(
+                code, obj=obj, context=context, model=model, brain=brain)
+
+        return value, model.instance
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Execution budgets of databoxes
+
+A budget limits the number of rows, the wall time and the number of ZODB
+object loads of a databox execution. The limits of the databox are capped
+by the site-wide limits of the registry.
+"""
+
+import threading
+import time
+
+from senaite.databox.behaviors.databox import IDataBoxBehavior
+from senaite.databox.utils import get_setting
+
+
+class BudgetExceeded(Exception):
+    """Raised when an execution exceeds its budget
+    """
+
+    def __init__(self, name, limit, value):
+        self.name = name
+        self.limit = limit
+        self.value = value
+        super(BudgetExceeded, self).__init__(
+            "{} budget of {} exceeded ({})".format(name, limit, value))
+
+
+def combine(*limits):
+    """Returns the smallest of the given limits, 0 means no limit
+    """
+    limits = filter(None, limits)
+    if not limits:
+        return 0
+    return min(limits)
+
+
+class Budget(object):
+    """Row, time and object load limits of an execution
+    """
+
+    def __init__(self, max_rows=0, max_seconds=0, max_loads=0,
+                 connection=None):
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.max_loads = max_loads
+        self.connection = connection
+        self.started = None
+        self.loads = 0
+        # object loads of other connections, e.g. of parallel workers
+        self.other_loads = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.started = time.time()
+        self.loads = self.get_load_count()
+
+    def get_load_count(self):
+        if self.connection is None:
+            return 0
+        return self.connection.getTransferCounts()[0]
+
+    def add_loads(self, loads):
+        """Account the object loads of another connection
+        """
+        with self.lock:
+            self.other_loads += loads
+
+    def get_elapsed(self):
+        if self.started is None:
+            return 0
+        return time.time() - self.started
+
+    def check(self, rows):
+        """Raise `BudgetExceeded` if processing another row exceeds the budget
+
+        :param rows: number of rows processed so far
+        """
+        if self.max_rows and rows >= self.max_rows:
+            raise BudgetExceeded("Row", self.max_rows, rows)
+        elapsed = self.get_elapsed()
+        if self.max_seconds and elapsed > self.max_seconds:
+            raise BudgetExceeded(
+                "Time", "{}s".format(self.max_seconds),
+                "{:.2f}s".format(elapsed))
+        loads = self.get_load_count() - self.loads + self.other_loads
+        if self.max_loads and loads > self.max_loads:
+            raise BudgetExceeded("Object load", self.max_loads, loads)
+
+
+def get_budget(databox):
+    """Returns the budget of the databox capped by the site-wide budget
+    """
+    adapter = IDataBoxBehavior(databox)
+    return Budget(
+        max_rows=combine(
+            adapter.max_rows, get_setting("databox_max_rows", 0)),
+        max_seconds=combine(
+            adapter.max_seconds, get_setting("databox_max_seconds", 0)),
+        max_loads=combine(
+            adapter.max_loads, get_setting("databox_max_loads", 0)),
+        connection=getattr(databox, "_p_jar", None))
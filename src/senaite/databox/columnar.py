@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Columnar export formats
+
+The Parquet export needs the optional `pyarrow` package, which is installed
+with the `parquet` extra of this package.
+"""
+
+from senaite.databox import datatypes
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def get_arrow_type(column_type):
+    """Returns the Arrow type of the column type
+    """
+    return {
+        datatypes.BOOL: pyarrow.bool_(),
+        datatypes.INT: pyarrow.int64(),
+        datatypes.FLOAT: pyarrow.float64(),
+        datatypes.DATE: pyarrow.date32(),
+        datatypes.DATETIME: pyarrow.timestamp("us", tz="UTC"),
+    }.get(column_type, pyarrow.string())
+
+
+def to_table(columns):
+    """Convert the columns to an Arrow table
+
+    :param columns: `senaite.databox.datatypes.Columns` of the rows
+    :returns: Arrow table with the inferred column types
+    """
+    names = []
+    arrays = []
+    for name, column_type, values in columns.get_columns():
+        names.append(name)
+        arrays.append(pyarrow.array(values, type=get_arrow_type(column_type)))
+    return pyarrow.Table.from_arrays(arrays, names=names)
+
+
+def to_parquet(columns):
+    """Returns the columns as Parquet file
+
+    :param columns: `senaite.databox.datatypes.Columns` of the rows
+    :returns: Parquet file contents
+    """
+    stream = pyarrow.BufferOutputStream()
+    pyarrow.parquet.write_table(to_table(columns), stream)
+    return stream.getvalue().to_pybytes()
@@ -26,6 +26,63 @@ DATE_INDEX_TYPES = ["DateIndex"]
 
 UID_CATALOG = "uid_catalog"
 
+# Annotation key of the slow log storage on the databox folder
+SLOW_LOG_STORAGE = "senaite.databox.slowlog"
+
+# Annotation key of the execution statistics on the databox folder
+STATS_STORAGE = "senaite.databox.stats"
+
+# Annotation key of the materialized rows on the databox
+SNAPSHOT_STORAGE = "senaite.databox.snapshot"
+
+# Annotation key of the materialized databoxes per type on the portal
+SNAPSHOT_REGISTRY = "senaite.databox.snapshot.registry"
+
+# Annotation keys of the delta query bookkeeping on the portal
+DELTA_TRACKED = "senaite.databox.delta.tracked"
+DELTA_TOMBSTONES = "senaite.databox.delta.tombstones"
+
+# Seconds the returned delta watermark overlaps with the delta execution.
+# This catches changes of transactions that were not yet committed when the
+# delta was queried and the minute resolution of date indexes.
+DELTA_WATERMARK_OVERLAP = 120
+
+# Seconds a rejected export should be retried after
+EXPORT_RETRY_AFTER = 30
+
+# Number of rows handed over to the export writer thread at once
+PIPELINE_BATCH_SIZE = 100
+
+# Maximum number of row batches waiting for the export writer thread
+PIPELINE_QUEUE_SIZE = 4
+
+# Number of catalog results whose objects are prefetched at once
+PREFETCH_BATCH_SIZE = 100
+
+# Maximum number of result UIDs kept in the results cache of a databox
+RESULTS_CACHE_SIZE = 5000
+
+# Number of consecutive results extracted by a worker of a parallel export
+PARALLEL_SHARD_SIZE = 1000
+
+# Number of shards per worker that are extracted ahead of the written rows
+PARALLEL_SHARDS_AHEAD = 2
+
+# Number of rows inserted at once into the tables of a SQLite export
+SQLITE_BATCH_SIZE = 1000
+
+# Request annotation key of the shared models of the exported objects
+MODEL_CACHE_KEY = "senaite.databox.models"
+
+# Maximum number of models kept in the request
+MODEL_CACHE_SIZE = 10000
+
+# Maximum number of formatted dates memoized per date format
+DATE_CACHE_SIZE = 10000
+
+# Request annotation key of the CSRF token and parent URLs of the links
+LINK_CACHE_KEY = "senaite.databox.links"
+
 PARENT_TYPES = {
     "Analysis": "AnalysisRequest",
     "AnalysisRequest": "Client",
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from plone.supermodel import model
+from senaite.core.registry.schema import ISenaiteRegistry
+from senaite.databox import _
+from zope import schema
+
+
+class IDataBoxRegistry(ISenaiteRegistry):
+    """Registry settings for databoxes
+    """
+
+    model.fieldset(
+        "databox",
+        label=_(u"DataBox"),
+        description=_("Configuration for databoxes"),
+        fields=[
+            "databox_slow_log_time_threshold",
+            "databox_slow_log_row_threshold",
+            "databox_slow_log_size",
+            "databox_delta_tombstone_days",
+            "databox_singleflight_timeout",
+            "databox_export_max_concurrent",
+            "databox_export_max_per_user",
+            "databox_export_queue_size",
+            "databox_export_queue_timeout",
+            "databox_max_rows",
+            "databox_max_seconds",
+            "databox_max_loads",
+            "databox_cache_results",
+            "databox_export_workers",
+            "databox_execution_stats",
+            "databox_stats_flush_interval",
+            "databox_stats_flush_size",
+        ],
+    )
+
+    databox_slow_log_time_threshold = schema.Float(
+        title=_(u"Slow log time threshold"),
+        description=_(
+            u"Record databox renderings and exports in the slow log that "
+            u"take longer than the given number of seconds. "
+            u"Set to 0 to disable."),
+        default=10.0,
+        min=0.0,
+        required=False,
+    )
+
+    databox_slow_log_row_threshold = schema.Int(
+        title=_(u"Slow log row threshold"),
+        description=_(
+            u"Record databox renderings and exports in the slow log that "
+            u"process more than the given number of rows. "
+            u"Set to 0 to disable."),
+        default=10000,
+        min=0,
+        required=False,
+    )
+
+    databox_slow_log_size = schema.Int(
+        title=_(u"Slow log size"),
+        description=_(
+            u"Maximum number of records kept in the slow log of a databox "
+            u"folder. The oldest records are discarded first."),
+        default=100,
+        min=1,
+        required=False,
+    )
+
+    databox_delta_tombstone_days = schema.Int(
+        title=_(u"Delta deletion retention"),
+        description=_(
+            u"Number of days the deletions of queried objects are kept for "
+            u"delta queries. Delta queries with an older watermark require "
+            u"a full export."),
+        default=30,
+        min=1,
+        required=False,
+    )
+
+    databox_singleflight_timeout = schema.Float(
+        title=_(u"Concurrent execution timeout"),
+        description=_(
+            u"Identical databox executions of concurrent requests wait for "
+            u"the result of the first execution for the given number of "
+            u"seconds before they compute the result on their own. "
+            u"Set to 0 to disable."),
+        default=30.0,
+        min=0.0,
+        required=False,
+    )
+
+    databox_export_max_concurrent = schema.Int(
+        title=_(u"Maximum concurrent exports"),
+        description=_(
+            u"Maximum number of databox exports that run at the same time "
+            u"per instance. Set to 0 for no limit."),
+        default=2,
+        min=0,
+        required=False,
+    )
+
+    databox_export_max_per_user = schema.Int(
+        title=_(u"Maximum concurrent exports per user"),
+        description=_(
+            u"Maximum number of databox exports of the same user that run "
+            u"at the same time per instance. Set to 0 for no limit."),
+        default=1,
+        min=0,
+        required=False,
+    )
+
+    databox_export_queue_size = schema.Int(
+        title=_(u"Export queue size"),
+        description=_(
+            u"Maximum number of exports that wait for a free slot. Exports "
+            u"exceeding the queue are rejected immediately."),
+        default=2,
+        min=0,
+        required=False,
+    )
+
+    databox_export_queue_timeout = schema.Float(
+        title=_(u"Export queue timeout"),
+        description=_(
+            u"Maximum number of seconds an export waits for a free slot "
+            u"before it is rejected."),
+        default=5.0,
+        min=0.0,
+        required=False,
+    )
+
+    databox_max_rows = schema.Int(
+        title=_(u"Maximum rows"),
+        description=_(
+            u"Maximum number of rows of a databox execution. Executions "
+            u"stop and return the partial result when the budget is "
+            u"exceeded. Set to 0 for no limit."),
+        default=0,
+        min=0,
+        required=False,
+    )
+
+    databox_max_seconds = schema.Int(
+        title=_(u"Maximum execution time"),
+        description=_(
+            u"Maximum number of seconds of a databox execution. "
+            u"Set to 0 for no limit."),
+        default=0,
+        min=0,
+        required=False,
+    )
+
+    databox_max_loads = schema.Int(
+        title=_(u"Maximum object loads"),
+        description=_(
+            u"Maximum number of objects a databox execution loads from the "
+            u"database. Set to 0 for no limit."),
+        default=0,
+        min=0,
+        required=False,
+    )
+
+    databox_cache_results = schema.Bool(
+        title=_(u"Cache the results"),
+        description=_(
+            u"Resolve the ordered results of a databox once and render the "
+            u"pages of the listing from the cached results. The cache is "
+            u"invalidated on any change of the catalog."),
+        default=True,
+        required=False,
+    )
+
+    databox_export_workers = schema.Int(
+        title=_(u"Parallel export workers"),
+        description=_(
+            u"Number of threads that extract the rows of large exports in "
+            u"parallel, each with its own database connection. "
+            u"Set to 0 to export in the request thread only."),
+        default=0,
+        min=0,
+        required=False,
+    )
+
+    databox_execution_stats = schema.Bool(
+        title=_(u"Record execution statistics"),
+        description=_(
+            u"Record the last run time, duration, rows, object loads and "
+            u"model cache hit rate of every databox execution and show them "
+            u"in the databoxes folder."),
+        default=True,
+        required=False,
+    )
+
+    databox_stats_flush_interval = schema.Float(
+        title=_(u"Execution statistics write interval"),
+        description=_(
+            u"Number of seconds the execution statistics of a databox folder "
+            u"are aggregated in memory before they are written. "
+            u"Set to 0 to write the statistics of every execution."),
+        default=60.0,
+        min=0.0,
+        required=False,
+    )
+
+    databox_stats_flush_size = schema.Int(
+        title=_(u"Execution statistics write size"),
+        description=_(
+            u"Number of pending executions of a databox folder after which "
+            u"the execution statistics are written before the interval has "
+            u"passed. Set to 0 to write them by interval only."),
+        default=100,
+        min=0,
+        required=False,
+    )
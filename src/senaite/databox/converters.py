@@ -20,18 +20,17 @@
 
 import ast
 import six
-from datetime import datetime
 from bika.lims import api
 from bika.lims.utils import get_link
-from DateTime import DateTime
-from plone.protect.utils import addTokenToUrl
-from Products.ATContentTypes.utils import DT2dt
 from senaite.core.api import dtime
-
-
-LINK_TO_PARENT_TYPES = [
-    "Analysis",
-]
+from senaite.databox.dates import DateFormatter
+from senaite.databox.dates import get_formatter
+from senaite.databox.interfaces import IBatchFieldConverter
+from senaite.databox.interfaces import IFieldConverter
+from senaite.databox.links import LINK_TO_PARENT_TYPES  # noqa
+from senaite.databox.links import get_links
+from zope.component import queryUtility
+from zope.interface import implementer
 
 PARAMETER_LITERALS = {
     "str": str,
@@ -59,20 +58,14 @@ def to_link(obj, key, value, **kw):
     value = to_string(obj, key, value)
     if not value:
         return ""
-    if api.get_portal_type(obj) in LINK_TO_PARENT_TYPES:
-        obj = api.get_parent(obj)
-    url = addTokenToUrl(api.get_url(obj))
+    url = get_links().get_url(obj, brain=kw.get("brain"))
     return get_link(url, value)
 
 
 def to_date(obj, key, value, dfmt="%d.%m.%Y"):
     """to date
     """
-    if isinstance(value, DateTime):
-        return DT2dt(value).strftime(dfmt)
-    elif isinstance(value, datetime):
-        return value.strftime(dfmt)
-    return value
+    return get_formatter(dfmt)(value)
 
 
 def to_long_date(obj, key, value, dfmt="%d.%m.%Y %H:%M"):
@@ -81,6 +74,85 @@ def to_long_date(obj, key, value, dfmt="%d.%m.%Y %H:%M"):
     return to_date(obj, key, value, dfmt=dfmt)
 
 
+def batch_to_string(key, **kw):
+    """to string
+    """
+    def convert(objs, values, brains=None):
+        return map(lambda value: to_string(None, key, value), values)
+    return convert
+
+
+def batch_to_link(key, **kw):
+    """to link
+    """
+    links = get_links()
+
+    def convert(objs, values, brains=None):
+        if brains is None:
+            brains = [None] * len(objs)
+        converted = []
+        for obj, value, brain in zip(objs, values, brains):
+            value = to_string(obj, key, value)
+            if value:
+                value = get_link(links.get_url(obj, brain=brain), value)
+            converted.append(value)
+        return converted
+    return convert
+
+
+def batch_to_date(key, dfmt="%d.%m.%Y"):
+    """to date
+    """
+    # the format is compiled once per column
+    formatter = DateFormatter(dfmt)
+
+    def convert(objs, values, brains=None):
+        return formatter.format_all(values)
+    return convert
+
+
+def batch_to_long_date(key, dfmt="%d.%m.%Y %H:%M"):
+    """to long date
+    """
+    return batch_to_date(key, dfmt=dfmt)
+
+
+@implementer(IBatchFieldConverter)
+class SingleValueConverter(object):
+    """Adapts a single value field converter to a batch converter
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __call__(self, key, **kw):
+        func = self.func
+
+        def convert(objs, values, brains=None):
+            return map(lambda pair: func(pair[0], key, pair[1], **kw),
+                       zip(objs, values))
+        return convert
+
+
+def get_batch_converter(name):
+    """Returns the batch converter of the given name
+
+    Converters that are only registered as single value field converters are
+    adapted to batch converters.
+
+    :param name: the name of the converter utility
+    :returns: batch converter or None
+    """
+    converter = queryUtility(IBatchFieldConverter, name=name)
+    if callable(converter):
+        return converter
+    func = queryUtility(IFieldConverter, name=name)
+    if callable(func):
+        return SingleValueConverter(func)
+    return None
+
+
 def convert_to(value, to_type):
     if to_type in PARAMETER_LITERALS:
         try:
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Column types of exported rows
+
+The types of the columns are inferred from the exported values, so that
+typed export formats keep numbers, dates and booleans.
+"""
+
+import re
+import six
+
+from bika.lims import api
+from datetime import date
+from datetime import datetime
+from DateTime import DateTime
+
+BOOL = "bool"
+INT = "int"
+FLOAT = "float"
+DATE = "date"
+DATETIME = "datetime"
+STRING = "string"
+
+# Time zones of the cast datetimes: UTC, the local time of the value or
+# unchanged with the time zone info
+UTC = "UTC"
+LOCAL = "local"
+
+# Numbers in strings without leading zeros, e.g. the formatted results
+NUMBER = re.compile(r"^-?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?$")
+
+# Range of the integer columns, e.g. Parquet int64 and SQLite INTEGER
+MIN_INT = -2 ** 63
+MAX_INT = 2 ** 63 - 1
+
+# Significant digits of the numbers kept by Excel
+EXCEL_DIGITS = 15
+
+
+def to_plain(value):
+    """Convert the value to a plain value of one of the column types
+
+    Dates are converted to datetimes with time zone info and all other values
+    that are not numbers or booleans to unicode.
+    """
+    if value is None or isinstance(value, (bool, float)):
+        return value
+    if isinstance(value, six.integer_types):
+        return value
+    if isinstance(value, DateTime):
+        return value.asdatetime()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, six.string_types):
+        return api.safe_unicode(value)
+    return api.safe_unicode(str(value))
+
+
+def get_type(value):
+    """Returns the column type of a plain value or None for empty values
+    """
+    if value is None or value == u"":
+        return None
+    if isinstance(value, bool):
+        return BOOL
+    if isinstance(value, six.integer_types):
+        return INT if MIN_INT <= value <= MAX_INT else STRING
+    if isinstance(value, float):
+        return FLOAT
+    if isinstance(value, datetime):
+        return DATETIME
+    if isinstance(value, date):
+        return DATE
+    return get_number_type(value)
+
+
+def get_number_type(value):
+    """Returns the column type of a number in a string
+
+    Only numbers that are written back exactly the same way are numbers, so
+    that e.g. "1.50", "1e3" or integers beyond the integer range are kept as
+    strings.
+    """
+    match = NUMBER.match(value)
+    if not match:
+        return STRING
+    if match.group(2) or match.group(3):
+        return FLOAT if repr(float(value)) == value else STRING
+    number = int(value)
+    if MIN_INT <= number <= MAX_INT and str(number) == value:
+        return INT
+    return STRING
+
+
+def infer_type(values):
+    """Returns the column type of the plain values
+
+    Integers mixed with floats are floats and dates mixed with datetimes are
+    datetimes. Any other mix of types is a string column.
+    """
+    types = set(filter(None, map(get_type, values)))
+    if len(types) == 1:
+        return types.pop()
+    if types == set([INT, FLOAT]):
+        return FLOAT
+    if types == set([DATE, DATETIME]):
+        return DATETIME
+    return STRING
+
+
+def is_exact(value, digits):
+    """Checks if the cast number is kept exactly with the significant digits
+
+    :param value: cast number or None
+    :param digits: number of significant digits
+    """
+    if value is None:
+        return True
+    if isinstance(value, six.integer_types):
+        return abs(value) < 10 ** digits
+    return float("{:.{}g}".format(value, digits)) == value
+
+
+def to_naive(value, tz=UTC):
+    """Convert the datetime to the given time zone
+
+    :param value: datetime with or without time zone info
+    :param tz: `UTC` for a naive datetime in UTC, `LOCAL` for a naive
+               datetime in the local time of the value, None to keep the
+               time zone info
+    """
+    if tz is None or value.tzinfo is None:
+        return value
+    if tz == UTC:
+        value = value - value.utcoffset()
+    return value.replace(tzinfo=None)
+
+
+def cast(value, column_type, tz=UTC):
+    """Cast the plain value to the column type
+
+    :param tz: time zone of the datetimes, see `to_naive`
+    """
+    if get_type(value) is None:
+        return None
+    if column_type == STRING:
+        if isinstance(value, (datetime, date)):
+            return api.safe_unicode(value.isoformat())
+        if isinstance(value, six.string_types):
+            return value
+        if isinstance(value, float):
+            return api.safe_unicode(repr(value))
+        return api.safe_unicode(str(value))
+    if column_type == INT:
+        return int(value)
+    if column_type == FLOAT:
+        return float(value)
+    if column_type == DATETIME:
+        if not isinstance(value, datetime):
+            return datetime(value.year, value.month, value.day)
+        return to_naive(value, tz=tz)
+    return value
+
+
+def infer_types(columns, digits=None):
+    """Returns the inferred types of the columns
+
+    :param columns: list of the plain values of every column
+    :param digits: significant digits of the numbers, number columns with
+                   values that are not kept exactly are string columns
+    """
+    types = map(infer_type, columns)
+    if digits is None:
+        return types
+    for num, (column_type, values) in enumerate(zip(types, columns)):
+        if column_type not in (INT, FLOAT):
+            continue
+        if not all(map(lambda v: is_exact(
+                cast(v, column_type), digits), values)):
+            types[num] = STRING
+    return types
+
+
+def cast_rows(rows, tz=UTC, digits=None):
+    """Cast the plain values of a batch of rows to their column types
+
+    The type of every column is inferred once for the batch.
+
+    :param rows: list of rows of plain values
+    :param tz: time zone of the datetimes, see `to_naive`
+    :param digits: significant digits of the numbers, see `infer_types`
+    :returns: list of rows of cast values
+    """
+    if not rows:
+        return []
+    types = infer_types(zip(*rows), digits=digits)
+    return map(lambda row: map(
+        lambda item: cast(item[0], item[1], tz=tz), zip(row, types)), rows)
+
+
+def to_json(value):
+    """JSON representation of the cast values that are not JSON types
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError("{} is not JSON serializable".format(repr(value)))
+
+
+class Columns(object):
+    """Column-wise buffer of the plain values of exported rows
+
+    The types of the columns are inferred once over all buffered rows, as
+    the columnar formats need one type per column.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.values = [[] for name in self.names]
+
+    def __len__(self):
+        return len(self.values[0]) if self.values else 0
+
+    def append(self, rows):
+        """Append a batch of rows
+        """
+        for row in rows:
+            for values, value in zip(self.values, row):
+                values.append(value)
+
+    def get_types(self):
+        """Returns the inferred types of the columns
+        """
+        return infer_types(self.values)
+
+    def get_columns(self):
+        """Returns the name, type and the cast values of each column
+        """
+        for name, values in zip(self.names, self.values):
+            column_type = infer_type(values)
+            yield name, column_type, [cast(v, column_type) for v in values]
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Fast formatting of dates
+
+The date formats are compiled once into format strings of the date parts,
+so that Zope `DateTime` values are formatted without converting them to
+Python datetimes first. Formatted values are memoized, because date columns
+often contain the same dates over and over again.
+"""
+
+import re
+from datetime import datetime
+
+from DateTime import DateTime
+from Products.ATContentTypes.utils import DT2dt
+from senaite.databox.config import DATE_CACHE_SIZE
+
+# Format of `DateTime.ISO`
+ISO_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Format fields of the compiled strftime directives, the indexes refer to
+# the parts returned by `get_parts`
+DIRECTIVES = {
+    "Y": "{0:04d}",
+    "m": "{1:02d}",
+    "d": "{2:02d}",
+    "H": "{3:02d}",
+    "M": "{4:02d}",
+    "S": "{5:02d}",
+    "y": "{6:02d}",
+    "%": "%",
+}
+
+DIRECTIVE = re.compile(r"%(.)")
+
+# Formatters by date format
+FORMATTERS = {}
+
+
+def compile_format(dfmt):
+    """Compile the strftime format into a format string of the date parts
+
+    :returns: format string or None if the format contains directives that
+              depend on the locale or the time zone
+    """
+    template = []
+    end = 0
+    for match in DIRECTIVE.finditer(dfmt):
+        field = DIRECTIVES.get(match.group(1))
+        if field is None:
+            return None
+        literal = dfmt[end:match.start()]
+        template.append(literal.replace("{", "{{").replace("}", "}}"))
+        template.append(field)
+        end = match.end()
+    rest = dfmt[end:]
+    if "%" in rest:
+        return None
+    template.append(rest.replace("{", "{{").replace("}", "}}"))
+    return "".join(template)
+
+
+def get_parts(value):
+    """Returns the year, month, day, hour, minute, second and short year
+    """
+    if isinstance(value, DateTime):
+        year, month, day, hour, minute, second = value.parts()[:6]
+    else:
+        year, month, day = value.year, value.month, value.day
+        hour, minute, second = value.hour, value.minute, value.second
+    return year, month, day, hour, minute, int(second), year % 100
+
+
+def get_key(value):
+    """Returns the memoization key of the date or None
+    """
+    if isinstance(value, DateTime):
+        # N.B. the hash of DateTime ignores the time zone
+        return value.micros(), value.timezone()
+    if isinstance(value, datetime):
+        # N.B. aware datetimes of the same instant are equal in any time zone
+        return value, value.utcoffset(), value.tzinfo
+    return None
+
+
+class DateFormatter(object):
+    """Formats dates with a compiled date format
+    """
+
+    def __init__(self, dfmt, size=DATE_CACHE_SIZE):
+        self.dfmt = dfmt
+        self.template = compile_format(dfmt)
+        self.size = size
+        self.cache = {}
+
+    def __call__(self, value):
+        """Returns the formatted date or the value if it is not a date
+        """
+        key = get_key(value)
+        if key is None:
+            return value
+        formatted = self.cache.get(key)
+        if formatted is None:
+            formatted = self.format(value)
+            if len(self.cache) >= self.size:
+                self.cache.clear()
+            self.cache[key] = formatted
+        return formatted
+
+    def format(self, value):
+        """Format the date without memoization
+        """
+        if self.template is None:
+            if isinstance(value, DateTime):
+                value = DT2dt(value)
+            return value.strftime(self.dfmt)
+        return self.template.format(*get_parts(value))
+
+    def format_all(self, values):
+        """Format the values of a column slice
+
+        Repeated dates, e.g. the dates of the catalog metadata of objects
+        created together, are formatted only once.
+        """
+        return map(self, values)
+
+
+def get_formatter(dfmt):
+    """Returns the shared formatter of the date format
+    """
+    formatter = FORMATTERS.get(dfmt)
+    if formatter is None:
+        formatter = FORMATTERS[dfmt] = DateFormatter(dfmt)
+    return formatter
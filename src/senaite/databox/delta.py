@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Bookkeeping for delta queries
+
+Delta queries return the rows of the objects that changed since a watermark.
+Deleted objects do not show up in the catalog anymore, therefore a tombstone
+is recorded for the removed objects of all types queried by databoxes.
+
+The tombstones are keyed by their date and UID, so that expired and recent
+tombstones are found with a range query.
+"""
+
+from BTrees.OOBTree import OOBTree
+from bika.lims import api
+from DateTime import DateTime
+from senaite.databox.config import DELTA_TOMBSTONES
+from senaite.databox.config import DELTA_TRACKED
+from senaite.databox.utils import get_setting
+from zope.annotation.interfaces import IAnnotations
+
+
+def get_storage(key, create=False):
+    """Returns the delta storage of the portal for the given key
+    """
+    annotations = IAnnotations(api.get_portal())
+    storage = annotations.get(key)
+    if storage is None and create:
+        storage = annotations[key] = OOBTree()
+    return storage
+
+
+def get_retention_days():
+    """Returns the number of days the tombstones are kept
+    """
+    return get_setting("databox_delta_tombstone_days", 30)
+
+
+def track(portal_type):
+    """Start recording the deletions of the portal type
+    """
+    if not portal_type:
+        return
+    tracked = get_storage(DELTA_TRACKED, create=True)
+    if portal_type not in tracked:
+        tracked[portal_type] = DateTime()
+
+
+def get_tracked_since(portal_type):
+    """Returns the date since the deletions of the portal type are recorded
+    """
+    tracked = get_storage(DELTA_TRACKED)
+    if not tracked:
+        return None
+    return tracked.get(portal_type)
+
+
+def is_complete(portal_type, since):
+    """Checks if all deletions of the portal type since the date are known
+
+    A full pull without date is always complete.
+    """
+    if not since:
+        return True
+    tracked_since = get_tracked_since(portal_type)
+    if tracked_since is None or since < tracked_since:
+        return False
+    return since >= DateTime() - get_retention_days()
+
+
+def get_tombstones(portal_type, create=False):
+    """Returns the tombstones of the portal type
+
+    :returns: mapping (timestamp, UID) -> UID or None
+    """
+    tombstones = get_storage(DELTA_TOMBSTONES, create=create)
+    if tombstones is None:
+        return None
+    if portal_type not in tombstones:
+        if not create:
+            return None
+        tombstones[portal_type] = OOBTree()
+    return tombstones[portal_type]
+
+
+def record_deletion(obj):
+    """Record a tombstone for the deleted object
+    """
+    portal_type = api.get_portal_type(obj)
+    if get_tracked_since(portal_type) is None:
+        return
+    tombstones = get_tombstones(portal_type, create=True)
+    uid = api.get_uid(obj)
+    tombstones[(DateTime().timeTime(), uid)] = uid
+    prune(tombstones)
+
+
+def prune(tombstones):
+    """Remove the tombstones that are older than the retention period
+
+    Only the expired tombstones are visited.
+    """
+    cutoff = (DateTime() - get_retention_days()).timeTime()
+    for key in list(tombstones.keys(max=(cutoff, ))):
+        del tombstones[key]
+
+
+def get_deletions(portal_type, since):
+    """Returns the UIDs of the objects deleted since the given date
+    """
+    tombstones = get_tombstones(portal_type)
+    if tombstones is None:
+        return []
+    uids = []
+    for uid in tombstones.values(min=(since.timeTime(), )):
+        # objects can be deleted again, e.g. after an undo
+        if uid not in uids:
+            uids.append(uid)
+    return uids
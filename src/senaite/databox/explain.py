@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import time
+
+from bika.lims import api
+from Products.PluginIndexes.interfaces import ILimitedResultIndex
+
+
+def get_length(rs):
+    """Returns the length of an intermediate result set
+    """
+    if not rs:
+        return 0
+    return len(rs)
+
+
+def get_security_query(catalog_tool):
+    """Returns the security restriction the catalog tool adds to the query
+    """
+    indexes = catalog_tool.indexes()
+    if "allowedRolesAndUsers" not in indexes:
+        return {}
+    list_allowed = getattr(catalog_tool, "_listAllowedRolesAndUsers", None)
+    if list_allowed is None:
+        return {}
+    user = api.get_current_user()
+    return {"allowedRolesAndUsers": list_allowed(user)}
+
+
+def get_sort_arguments(catalog, query):
+    """Returns the sort index, sort order and sort limit of the query
+    """
+    sort_index = catalog._getSortIndex(query)
+    limit = catalog._get_sort_attr("limit", query)
+    reverse = False
+    if sort_index is not None:
+        order = catalog._get_sort_attr("order", query) or ""
+        reverse = order.lower() in ("reverse", "descending")
+    return sort_index, reverse, limit
+
+
+def explain(catalog_tool, query):
+    """Explain how the catalog executes the query
+
+    The indexes are applied in the order of the catalog query plan, like
+    `Catalog.search` does. For each index the size of the intermediate
+    result and the time spent is measured, as well as the number of
+    records the index matches on its own (selectivity).
+
+    :param catalog_tool: the catalog tool to query
+    :param query: the catalog query
+    :returns: dictionary with the plan, the index and sort measurements
+    """
+    catalog = catalog_tool._catalog
+    query = dict(query)
+    query.update(get_security_query(catalog_tool))
+    query = catalog.make_query(query)
+    total = len(catalog)
+
+    cr = catalog.getCatalogPlan(query)
+    plan = cr.plan()
+    planned = bool(plan)
+    if not planned:
+        plan = catalog._sorted_search_indexes(query)
+    plan = filter(lambda index_id: index_id in catalog.indexes, plan)
+
+    indexes = []
+    rs = None
+    for index_id in plan:
+        index = catalog.getIndex(index_id)
+        # apply the index on the intermediate result
+        index_start = time.time()
+        rs = catalog._search_index(cr, index_id, query, rs)
+        duration = time.time() - index_start
+        # apply the index alone to calculate its selectivity
+        matches = get_length(catalog._search_index(cr, index_id, query, None))
+        indexes.append({
+            "index": index_id,
+            "meta_type": index.meta_type,
+            "query": repr(query.get(index_id)),
+            "limited": ILimitedResultIndex.providedBy(index),
+            "result": get_length(rs),
+            "duration": duration,
+            "matches": matches,
+            "selectivity": float(matches) / total if total else 0.0,
+        })
+        if not rs:
+            break
+
+    # sort the result like `Catalog.search` does
+    sort = None
+    count = get_length(rs)
+    sort_index, reverse, limit = get_sort_arguments(catalog, query)
+    if rs and sort_index is not None:
+        b_start, b_size, limit, name = catalog._sort_limit_arguments(
+            query, sort_index, reverse, limit)
+        sort_start = time.time()
+        results = catalog.sortResults(
+            rs, sort_index, reverse, limit, True,
+            actual_result_count=count, b_start=b_start, b_size=b_size)
+        sort = {
+            "index": name,
+            "limit": limit,
+            "reverse": reverse,
+            "duration": time.time() - sort_start,
+            "results": len(results),
+        }
+
+    duration = sum(map(lambda index: index["duration"], indexes))
+    if sort:
+        duration += sort["duration"]
+
+    return {
+        "catalog": catalog_tool.getId(),
+        "query": query,
+        "planned": planned,
+        "plan": map(lambda index: index["index"], indexes),
+        "indexes": indexes,
+        "sort": sort,
+        "total": total,
+        "count": count,
+        "duration": duration,
+        "hint": get_hint(indexes, count),
+    }
+
+
+def get_hint(indexes, count):
+    """Returns the most selective index of the query
+
+    The index matching the fewest records on its own should be applied
+    first and is the best candidate to restrict the query further.
+    """
+    if not indexes:
+        return None
+    ranking = sorted(indexes, key=lambda index: index["matches"])
+    best = ranking[0]
+    return {
+        "index": best["index"],
+        "matches": best["matches"],
+        "first": best["index"] == indexes[0]["index"],
+        "count": count,
+    }
@@ -42,6 +42,21 @@ class IFieldConverter(Interface):
     """
 
 
+class IBatchFieldConverter(Interface):
+    """Field converter utility that converts a whole column slice at once
+    """
+
+    def __call__(key, **kw):
+        """Set up the conversion of the column with the given key
+
+        :param key: the column ID
+        :returns: function that takes the list of objects and the list of
+                  values of a column slice and returns the converted values.
+                  The `brains` keyword contains the catalog brains of the
+                  objects that are the objects of the rows, or None.
+        """
+
+
 class IDataBoxJS(IViewletManager):
     """A viewlet manager that provides the JavaScripts for DataBox
     """
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Request-scoped link URLs of the converted columns
+
+The CSRF token is computed once per request and the URLs are built from
+the catalog paths, so that link columns neither compute a token nor wake
+up the parent objects for every row.
+"""
+
+from bika.lims import api
+from plone.protect.authenticator import createToken
+from senaite.databox.config import LINK_CACHE_KEY
+from zope.annotation.interfaces import IAnnotations
+
+# Objects that are linked by the URL of their parent
+LINK_TO_PARENT_TYPES = [
+    "Analysis",
+]
+
+
+class Links(object):
+    """Builds the token protected URLs of the links of a request
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.token = None
+        self.parents = {}
+        self.portal = None
+
+    def get_token(self):
+        """Returns the CSRF token of the request
+        """
+        if self.token is None:
+            self.token = createToken()
+        return self.token
+
+    def get_url(self, obj, brain=None):
+        """Returns the URL of the object or of its parent
+
+        :param obj: the linked object
+        :param brain: the catalog brain of the object or None
+        """
+        if brain is not None:
+            path = brain.getPath()
+            portal_type = brain.portal_type
+        else:
+            path = api.get_path(obj)
+            portal_type = api.get_portal_type(obj)
+        if portal_type in LINK_TO_PARENT_TYPES:
+            return self.get_parent_url(path)
+        return self.to_url(path)
+
+    def get_parent_url(self, path):
+        """Returns the cached URL of the parent of the path
+        """
+        parent = path.rsplit("/", 1)[0]
+        url = self.parents.get(parent)
+        if url is None:
+            url = self.parents[parent] = self.to_url(parent)
+        return url
+
+    def get_portal(self):
+        """Returns the physical path and the URL of the portal
+        """
+        if self.portal is None:
+            portal = api.get_portal()
+            self.portal = (api.get_path(portal), api.get_url(portal))
+        return self.portal
+
+    def to_url(self, path):
+        """Returns the token protected URL of the path
+
+        N.B. The paths of e.g. the `uid_catalog` brains are relative to the
+             portal, like in `ListingView.url_or_path_to_url`.
+
+        :param path: physical path or path relative to the portal
+        """
+        portal_path, portal_url = self.get_portal()
+        if path == portal_path:
+            path = ""
+        elif path.startswith(portal_path + "/"):
+            path = path[len(portal_path) + 1:]
+        url = "/".join([portal_url, path.lstrip("/")]).rstrip("/")
+        return "{}?_authenticator={}".format(url, self.get_token())
+
+
+def get_links(request=None):
+    """Returns the links of the request
+    """
+    if request is None:
+        request = api.get_request()
+    annotations = IAnnotations(request, None)
+    if annotations is None:
+        return Links(request)
+    links = annotations.get(LINK_CACHE_KEY)
+    if links is None:
+        links = annotations[LINK_CACHE_KEY] = Links(request)
+    return links
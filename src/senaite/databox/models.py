@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Request-scoped cache of the models of exported objects
+
+The databoxes rendered or exported in one request share the models of
+their objects, so that the same objects and references, e.g. the clients
+or sample types of the samples, are only resolved once per request.
+"""
+
+import collections
+
+from bika.lims import api
+from senaite.app.supermodel.model import SuperModel
+from senaite.databox.config import MODEL_CACHE_KEY
+from senaite.databox.config import MODEL_CACHE_SIZE
+from zope.annotation.interfaces import IAnnotations
+
+
+class ModelCache(object):
+    """Models by UID, the oldest models are dropped first
+    """
+
+    def __init__(self, size=MODEL_CACHE_SIZE):
+        self.size = size
+        self.models = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.models)
+
+    def get_model(self, thing):
+        """Returns the cached model of the object, brain, UID or model
+        """
+        if isinstance(thing, SuperModel):
+            uid = thing.uid
+        elif api.is_uid(thing):
+            uid = thing
+        else:
+            uid = api.get_uid(thing)
+        model = self.models.get(uid)
+        if model is not None:
+            self.hits += 1
+            return model
+        self.misses += 1
+        model = thing if isinstance(thing, SuperModel) else SuperModel(thing)
+        if not uid:
+            # temporary objects
+            return model
+        self.models[uid] = model
+        if len(self.models) > self.size:
+            # N.B. the dropped model deactivates its object when collected
+            self.models.popitem(last=False)
+        return model
+
+
+def get_cache(request):
+    """Returns the model cache of the request
+    """
+    annotations = IAnnotations(request, None)
+    if annotations is None:
+        return ModelCache()
+    cache = annotations.get(MODEL_CACHE_KEY)
+    if cache is None:
+        cache = annotations[MODEL_CACHE_KEY] = ModelCache()
+    return cache
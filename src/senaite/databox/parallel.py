@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Parallel extraction of the rows of an export
+
+The ordered UIDs of the results are split into shards of consecutive UIDs.
+Every shard is processed in a worker thread with its own ZODB connection,
+request and security context. The rows of the shards are returned in the
+order of the shards, which keeps the sort order of the results.
+
+Only a limited number of shards is extracted ahead of the written rows, so
+that the rows of slow writers do not pile up in memory. The time and object
+load budget of the export is checked by the workers before every shard.
+"""
+
+import collections
+import transaction
+from AccessControl.SecurityManagement import newSecurityManager
+from AccessControl.SecurityManagement import noSecurityManager
+from bika.lims import api
+from multiprocessing.pool import ThreadPool
+from senaite.databox import logger
+from senaite.databox.config import PARALLEL_SHARD_SIZE
+from senaite.databox.config import PARALLEL_SHARDS_AHEAD
+from Testing.makerequest import makerequest
+from zope.component.hooks import setSite
+from zope.globalrequest import setRequest
+from zope.interface import alsoProvides
+from zope.interface import directlyProvidedBy
+
+
+def get_shards(uids, size=PARALLEL_SHARD_SIZE):
+    """Split the UIDs into shards of consecutive UIDs
+    """
+    return [uids[num:num + size] for num in range(0, len(uids), size)]
+
+
+class Worker(object):
+    """Extracts the rows of a shard with its own ZODB connection
+    """
+
+    def __init__(self, databox, request, func, budget=None):
+        """
+        :param databox: the databox object of the export
+        :param request: the request of the export
+        :param func: function called with the databox view of the worker and
+                     the shard, which returns the rows of the shard
+        :param budget: `senaite.databox.budget.Budget` of the export
+        """
+        self.db = databox._p_jar.db()
+        self.portal_path = api.get_path(api.get_portal())
+        self.path = api.get_path(databox)
+        self.user_id = api.get_current_user().getId()
+        self.layers = list(directlyProvidedBy(request))
+        self.func = func
+        self.budget = budget
+
+    def __call__(self, shard):
+        if self.budget is not None:
+            # the rows are limited by the UIDs of the export already
+            self.budget.check(0)
+        connection = self.db.open()
+        # count the object loads of this shard only
+        connection.getTransferCounts(clear=True)
+        try:
+            app = makerequest(connection.root()["Application"])
+            request = app.REQUEST
+            # the views can be registered for the browser layers of the site
+            alsoProvides(request, *self.layers)
+            setRequest(request)
+            portal = app.unrestrictedTraverse(self.portal_path)
+            setSite(portal)
+            self.login(app, portal)
+            databox = portal.unrestrictedTraverse(self.path)
+            view = api.get_view("view", context=databox, request=request)
+            return self.func(view, shard)
+        finally:
+            if self.budget is not None:
+                self.budget.add_loads(connection.getTransferCounts()[0])
+            transaction.abort()
+            noSecurityManager()
+            setSite(None)
+            setRequest(None)
+            connection.close()
+
+    def login(self, app, portal):
+        """Set the user of the export as the current user
+        """
+        if self.user_id is None:
+            # anonymous user
+            return
+        for acl_users in (portal.acl_users, app.acl_users):
+            user = acl_users.getUserById(self.user_id)
+            if user is not None:
+                newSecurityManager(None, user.__of__(acl_users))
+                return
+        raise ValueError("User '{}' not found".format(self.user_id))
+
+
+def extract(databox, request, uids, func, workers,
+            shard_size=PARALLEL_SHARD_SIZE, budget=None):
+    """Extract the rows of the UIDs in worker threads
+
+    `BudgetExceeded` is raised when the workers exceed the time or object
+    load budget. The rows of the previous shards are returned before.
+
+    :param databox: the databox object of the export
+    :param request: the request of the export
+    :param uids: ordered UIDs of the results
+    :param func: function called with the databox view of a worker and a
+                 shard of UIDs, which returns the rows of the shard
+    :param workers: number of worker threads
+    :param shard_size: number of UIDs per shard
+    :param budget: `senaite.databox.budget.Budget` of the export
+    :returns: iterator of the rows of each shard in the order of the UIDs
+    """
+    shards = collections.deque(get_shards(uids, size=shard_size))
+    logger.info("Extracting {} rows of {} in {} shards with {} workers"
+                .format(len(uids), api.get_path(databox), len(shards),
+                        workers))
+    worker = Worker(databox, request, func, budget=budget)
+    workers = min(workers, len(shards)) or 1
+    pool = ThreadPool(workers)
+    pending = collections.deque()
+    try:
+        while shards or pending:
+            # extract only a limited number of shards ahead
+            while shards and len(pending) < workers * PARALLEL_SHARDS_AHEAD:
+                pending.append(pool.apply_async(worker, (shards.popleft(),)))
+            # the rows are returned in the order of the shards
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
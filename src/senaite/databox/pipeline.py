@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Pipelined serialization of exported rows
+
+The rows of an export are serialized in a writer thread, while the request
+thread loads the objects of the next rows. Only plain values must be handed
+over to the writer thread, because the persistent objects belong to the
+ZODB connection of the request thread.
+"""
+
+import six
+import sys
+import threading
+import time
+
+from senaite.databox.config import PIPELINE_BATCH_SIZE
+from senaite.databox.config import PIPELINE_QUEUE_SIZE
+from six.moves import queue
+
+# Marks the end of the rows
+STOP = object()
+
+
+class Pipeline(object):
+    """Hands over batches of rows to a writer thread
+    """
+
+    def __init__(self, write, convert=None, flushed=None,
+                 batch_size=PIPELINE_BATCH_SIZE,
+                 queue_size=PIPELINE_QUEUE_SIZE):
+        """
+        :param write: function that writes a list of rows, called in the
+                      writer thread
+        :param convert: function that converts a row to plain values, called
+                        in the request thread
+        :param flushed: function called in the request thread after a batch
+                        was handed over, e.g. to stream the written output
+        :param batch_size: number of rows per batch
+        :param queue_size: maximum number of waiting batches
+        """
+        self.write = write
+        self.convert = convert
+        self.flushed = flushed
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch = []
+        self.rows = 0
+        self.duration = 0
+        self.error = None
+        self.thread = threading.Thread(
+            target=self.run, name="senaite.databox.pipeline")
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # stop the writer thread and raise the original error
+            self.queue.put(STOP)
+            self.thread.join()
+            return False
+        self.close()
+
+    def put(self, row):
+        """Add a row
+
+        Blocks while the writer thread has the maximum number of batches
+        waiting, which caps the memory of the export.
+        """
+        if self.convert is not None:
+            row = self.convert(row)
+        self.batch.append(row)
+        self.rows += 1
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Hand over the pending rows to the writer thread
+        """
+        if self.error is not None:
+            six.reraise(*self.error)
+        if self.batch:
+            self.queue.put(self.batch)
+            self.batch = []
+        if self.flushed is not None:
+            self.flushed()
+
+    def close(self):
+        """Write the pending rows and wait for the writer thread
+        """
+        self.flush()
+        self.queue.put(STOP)
+        self.thread.join()
+        if self.error is not None:
+            six.reraise(*self.error)
+
+    def run(self):
+        """Write the batches until the end of the rows
+        """
+        while True:
+            batch = self.queue.get()
+            if batch is STOP:
+                return
+            if self.error is not None:
+                # keep draining the queue to not block the request thread
+                continue
+            start = time.time()
+            try:
+                self.write(batch)
+            except Exception:
+                self.error = sys.exc_info()
+            finally:
+                self.duration += time.time() - start
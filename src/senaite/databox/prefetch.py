@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Bulk prefetch of the objects of catalog results
+
+Storages that support batched loads, e.g. ZEO or RelStorage, fetch the
+objects of a whole batch of catalog results in one round-trip instead of
+one round-trip per object. Other storages ignore the prefetch.
+"""
+
+from Acquisition import aq_base
+from bika.lims import api
+from senaite.databox import logger
+from senaite.databox.config import PREFETCH_BATCH_SIZE
+from senaite.databox.config import UID_CATALOG
+
+
+def is_ghost(obj):
+    """Checks if the object is not loaded from the database yet
+    """
+    return getattr(aq_base(obj), "_p_changed", False) is None
+
+
+def get_ghosts(brains):
+    """Returns the objects of the brains without loading them
+
+    Every container is traversed once and the objects are taken from their
+    containers, so that the objects themselves are not activated.
+
+    N.B. the objects are only used to prefetch their state, the rows fetch
+         the objects with security checks.
+    """
+    portal = api.get_portal()
+    containers = {}
+    ghosts = []
+    for brain in brains:
+        # the paths of the uid_catalog are relative to the portal
+        parent_path, sep, obj_id = brain.getPath().rpartition("/")
+        if sep and parent_path not in containers:
+            containers[parent_path] = portal.unrestrictedTraverse(
+                parent_path or "/", None)
+        container = containers[parent_path] if sep else portal
+        if getattr(aq_base(container), "_getOb", None) is None:
+            continue
+        ghost = container._getOb(obj_id, None)
+        if ghost is not None:
+            ghosts.append(ghost)
+    return ghosts
+
+
+def prefetch(objects):
+    """Prefetch the state of the objects that are not loaded yet
+    """
+    ghosts = filter(is_ghost, filter(None, objects))
+    if not ghosts:
+        return 0
+    connection = aq_base(ghosts[0])._p_jar
+    prefetch = getattr(connection, "prefetch", None)
+    if prefetch is None:
+        return 0
+    prefetch(map(lambda obj: aq_base(obj)._p_oid, ghosts))
+    return len(ghosts)
+
+
+def has_metadata(brain, name):
+    """Checks if the catalog keeps the UIDs of the reference field
+    """
+    return "get{}UID".format(name) in brain.__record_schema__
+
+
+def get_metadata_uids(brains, names):
+    """Returns the UIDs referenced by the given fields from the metadata
+
+    Only fields with a `get<Name>UID` metadata column are looked up.
+    """
+    uids = set()
+    for brain in brains:
+        for name in filter(lambda name: has_metadata(brain, name), names):
+            value = getattr(brain, "get{}UID".format(name), None)
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            uids.update(filter(api.is_uid, value))
+    return uids
+
+
+def get_reference_uids(objects, names):
+    """Returns the UIDs referenced by the given fields of the objects
+    """
+    uids = set()
+    fields = {}
+    for obj in objects:
+        portal_type = api.get_portal_type(obj)
+        if portal_type not in fields:
+            fields[portal_type] = api.get_fields(obj)
+        for name in names:
+            field = fields[portal_type].get(name)
+            getter = getattr(field, "getRaw", None)
+            getter = getter or getattr(field, "get_raw", None)
+            if getter is None:
+                continue
+            try:
+                value = getter(obj)
+            except Exception as exc:
+                logger.debug("Can not get the references of {}: {}".format(
+                    name, repr(exc)))
+                continue
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            uids.update(filter(api.is_uid, value))
+    return uids
+
+
+def get_referenced_ghosts(uids):
+    """Returns the objects of the UIDs without loading them
+    """
+    uids = set(uids)
+    brains = []
+    for name in (UID_CATALOG, "portal_catalog"):
+        if not uids:
+            break
+        catalog = api.get_tool(name)
+        for brain in catalog.unrestrictedSearchResults(UID=list(uids)):
+            uids.discard(brain.UID)
+            brains.append(brain)
+    return get_ghosts(brains)
+
+
+def prefetch_brains(brains, references=None):
+    """Prefetch the objects of the brains and their referenced objects
+
+    The references that are kept in the catalog metadata are prefetched
+    together with the objects of the brains.
+
+    :param brains: catalog brains
+    :param references: names of the reference fields to prefetch
+    """
+    if not brains:
+        return
+    references = references or []
+    known = filter(lambda name: has_metadata(brains[0], name), references)
+    objects = get_ghosts(brains)
+    uids = get_metadata_uids(brains, known)
+    prefetch(objects + get_referenced_ghosts(uids))
+    others = filter(lambda name: name not in known, references)
+    if not others or not objects:
+        return
+    # the other references are only known when the objects are loaded
+    uids = get_reference_uids(objects, others)
+    if uids:
+        prefetch(get_referenced_ghosts(uids))
+
+
+def iter_prefetched(brains, references=None, batch_size=PREFETCH_BATCH_SIZE):
+    """Iterate over the brains and prefetch the objects of each batch
+
+    The objects of the next batch are prefetched before the first brain of
+    the batch is returned.
+    """
+    batch = []
+    for brain in brains:
+        batch.append(brain)
+        if len(batch) >= batch_size:
+            prefetch_brains(batch, references)
+            for item in batch:
+                yield item
+            batch = []
+    if batch:
+        prefetch_brains(batch, references)
+        for item in batch:
+            yield item
@@ -19,6 +19,7 @@
 # Some rights reserved, see README and LICENSE.
 
 from senaite.databox import logger
+from senaite.databox import stats
 from plone.registry.interfaces import IRegistry
 from zope.component import getUtility
 
@@ -39,6 +40,7 @@ def setup_handler(context):
     portal = context.getSite()  # noqa
     add_databoxes_folder(portal)
     setup_navigation_types(portal)
+    setup_execution_stats(portal)
     logger.info("SENAITE.DATABOX setup handler [DONE]")
 
 
@@ -50,6 +52,15 @@ def add_databoxes_folder(portal):
         portal.invokeFactory("DataBoxFolder", "databoxes", title="Databoxes")
 
 
+def setup_execution_stats(portal):
+    """Add the storage of the execution statistics to the databox folder
+
+    N.B. the statistics are written in separate transactions, therefore the
+         storage is added upfront to not modify the folder itself.
+    """
+    stats.get_storage(portal.get("databoxes"), create=True)
+
+
 def setup_navigation_types(portal):
     """Add additional types for navigation
     """
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Coalescing of concurrent identical executions
+
+While an execution for a key is in flight, other threads requesting the same
+key wait for its result instead of computing it again. Waiting threads fall
+back to compute the result on their own after a timeout or if the first
+execution failed.
+"""
+
+import copy
+import threading
+
+from senaite.databox import logger
+
+
+class Flight(object):
+    """A running execution
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.followers = 0
+        self.failed = False
+        self.result = None
+
+
+class SingleFlight(object):
+    """Registry of the executions in flight
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def do(self, key, func, share=copy.deepcopy, timeout=30):
+        """Call the function once for concurrent calls with the same key
+
+        :param key: hashable key of the execution
+        :param func: function that computes the result
+        :param share: function that converts the result into a copy that is
+                      safe to be used in other threads
+        :param timeout: seconds to wait for a running execution
+        :returns: the result of the function
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                flight.followers += 1
+
+        if leader:
+            return self.lead(key, flight, func, share)
+        return self.follow(key, flight, func, timeout)
+
+    def lead(self, key, flight, func, share):
+        """Compute the result and share it with the waiting threads
+        """
+        try:
+            result = func()
+        except Exception:
+            with self.lock:
+                del self.flights[key]
+            flight.failed = True
+            flight.event.set()
+            raise
+
+        with self.lock:
+            # no other thread can join from now on
+            del self.flights[key]
+        try:
+            if flight.followers:
+                flight.result = share(result)
+        except Exception as exc:
+            logger.error("Failed to share the result of {}: {}".format(
+                repr(key), repr(exc)))
+            flight.failed = True
+        finally:
+            flight.event.set()
+        return result
+
+    def follow(self, key, flight, func, timeout):
+        """Wait for the result of the running execution
+        """
+        if not flight.event.wait(timeout):
+            logger.warn("Timeout waiting for the execution of {}, "
+                        "computing independently".format(repr(key)))
+            return func()
+        if flight.failed:
+            return func()
+        # every thread gets its own copy of the shared result
+        return copy.deepcopy(flight.result)
+
+    def in_flight(self, key):
+        """Checks if an execution for the key is running
+        """
+        with self.lock:
+            return key in self.flights
+
+
+# Executions of the databox views in this process
+flights = SingleFlight()
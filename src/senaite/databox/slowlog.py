@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from bika.lims import api
+from DateTime import DateTime
+from persistent.list import PersistentList
+from senaite.databox import logger
+from senaite.databox.config import SLOW_LOG_STORAGE
+from senaite.databox.utils import commit_in_separate_transaction
+from senaite.databox.utils import get_setting
+from zope.annotation.interfaces import IAnnotations
+
+
+def is_slow(duration, rows):
+    """Checks if the execution exceeds one of the slow log thresholds
+    """
+    time_threshold = get_setting("databox_slow_log_time_threshold", 10.0)
+    row_threshold = get_setting("databox_slow_log_row_threshold", 10000)
+    if time_threshold and duration >= time_threshold:
+        return True
+    if row_threshold and rows >= row_threshold:
+        return True
+    return False
+
+
+def get_storage(folder, create=False):
+    """Returns the slow log storage of the databox folder
+    """
+    annotations = IAnnotations(folder)
+    storage = annotations.get(SLOW_LOG_STORAGE)
+    if storage is None and create:
+        storage = annotations[SLOW_LOG_STORAGE] = PersistentList()
+    return storage
+
+
+def get_records(folder):
+    """Returns the slow log records of the folder sorted by cost
+    """
+    storage = get_storage(folder)
+    if not storage:
+        return []
+    return sorted(storage, key=lambda r: r.get("duration"), reverse=True)
+
+
+def clear(folder):
+    """Remove all slow log records of the folder
+    """
+    annotations = IAnnotations(folder)
+    if SLOW_LOG_STORAGE in annotations:
+        del annotations[SLOW_LOG_STORAGE]
+
+
+def record(databox, **info):
+    """Record a slow execution of the databox in the log of its folder
+
+    :param databox: DataBox content object
+    :param info: execution details, e.g. query, rows and timings
+    """
+    size = get_setting("databox_slow_log_size", 100)
+    entry = {
+        "uid": api.get_uid(databox),
+        "title": api.safe_unicode(databox.Title()),
+        "path": api.get_path(databox),
+        "date": DateTime(),
+        "user": api.get_current_user().getId(),
+    }
+    entry.update(info)
+
+    def write(folder):
+        storage = get_storage(folder, create=True)
+        storage.append(entry)
+        # discard the oldest records
+        if len(storage) > size:
+            del storage[:len(storage) - size]
+
+    folder = api.get_parent(databox)
+    try:
+        commit_in_separate_transaction(folder, write)
+    except Exception as exc:
+        logger.error("Failed to write slow log record for {}: {}"
+                     .format(repr(databox), repr(exc)))
+        return None
+
+    logger.warn("Slow databox execution of {}: {:.2f}s, {} rows".format(
+        entry["path"], entry.get("duration", 0), entry.get("rows", 0)))
+    return entry
@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Materialized databox snapshots
+
+A materialized databox keeps the extracted rows of its queried objects keyed
+by UID in an annotation. The rows are updated incrementally when the
+objects of the queried type or the objects referenced by the rows are
+added, modified, transitioned or removed, so that the views and exports do
+not need to wake up the objects.
+
+Snapshots of changed databoxes are not rebuilt when the databox is saved,
+but by the next view of the databox in a separate transaction.
+"""
+
+import hashlib
+import json
+import threading
+import weakref
+from datetime import date
+from datetime import datetime
+
+import six
+import transaction
+from Acquisition import aq_base
+from Acquisition import aq_inner
+from Acquisition import aq_parent
+from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOTreeSet
+from bika.lims import api
+from DateTime import DateTime
+from persistent.mapping import PersistentMapping
+from senaite.databox import logger
+from senaite.databox.behaviors.databox import IDataBoxBehavior
+from senaite.databox.config import SNAPSHOT_REGISTRY
+from senaite.databox.config import SNAPSHOT_STORAGE
+from senaite.databox.utils import commit_in_separate_transaction
+from zope.annotation.interfaces import IAnnotations
+
+# Values that are stored as they are in the snapshot
+STORABLE_TYPES = six.string_types + six.integer_types + (
+    float, bool, type(None), DateTime, datetime, date)
+
+# Format of the stored rows, snapshots of other formats are rebuilt
+SNAPSHOT_VERSION = 3
+
+# Pending object UIDs per transaction
+_pending = weakref.WeakKeyDictionary()
+
+# UIDs of the databoxes whose snapshots are rebuilt in this process
+_building = set()
+_building_lock = threading.Lock()
+
+
+def make_key(config):
+    """Returns a hash of the given configuration
+    """
+    data = json.dumps(config, sort_keys=True, default=repr)
+    return hashlib.md5(data).hexdigest()
+
+
+def get_config_key(databox):
+    """Returns a hash of the databox configuration the rows depend on
+    """
+    adapter = IDataBoxBehavior(databox)
+    return make_key({
+        "version": SNAPSHOT_VERSION,
+        "query_type": adapter.query_type,
+        "columns": adapter.columns,
+        "params": adapter.params,
+    })
+
+
+def get_query_key(databox):
+    """Returns a hash of the databox configuration the results depend on
+
+    The columns are not part of the key, because they do not change the
+    results of the catalog query.
+    """
+    adapter = IDataBoxBehavior(databox)
+    return make_key({
+        "query_type": adapter.query_type,
+        "date_index": adapter.date_index,
+        "date_from": adapter.date_from,
+        "date_to": adapter.date_to,
+        "advanced_query": adapter.advanced_query,
+        "sort_on": adapter.sort_on,
+        "sort_order": adapter.sort_order,
+        "params": adapter.params,
+    })
+
+
+def get_storage(databox, create=False):
+    """Returns the snapshot storage of the databox
+    """
+    annotations = IAnnotations(databox)
+    storage = annotations.get(SNAPSHOT_STORAGE)
+    if storage is None and create:
+        storage = annotations[SNAPSHOT_STORAGE] = PersistentMapping()
+        storage["config"] = None
+        storage["rows"] = OOBTree()
+        # referenced UID -> UIDs of the rows that show its values
+        storage["refs"] = OOBTree()
+    return storage
+
+
+def is_current(databox):
+    """Checks if the snapshot was built for the current configuration
+    """
+    storage = get_storage(databox)
+    if storage is None:
+        return False
+    return storage.get("config") == get_config_key(databox)
+
+
+def is_stale(databox):
+    """Checks if the snapshot of the materialized databox must be rebuilt
+    """
+    if not IDataBoxBehavior(databox).materialized:
+        return False
+    return not is_current(databox)
+
+
+def get_rows(databox):
+    """Returns the materialized rows of the databox keyed by UID
+
+    :returns: BTree of UID -> row or None if the snapshot is not usable
+    """
+    if not IDataBoxBehavior(databox).materialized:
+        return None
+    if not is_current(databox):
+        return None
+    return get_storage(databox)["rows"]
+
+
+def clear(databox):
+    """Remove the snapshot of the databox
+    """
+    annotations = IAnnotations(databox)
+    if SNAPSHOT_STORAGE in annotations:
+        del annotations[SNAPSHOT_STORAGE]
+
+
+def make_storable(value):
+    """Convert the value to be stored in the snapshot
+    """
+    if isinstance(value, STORABLE_TYPES):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(map(make_storable, value))
+    if isinstance(value, dict):
+        return dict(map(
+            lambda item: (item[0], make_storable(item[1])), value.items()))
+    return api.safe_unicode(str(value))
+
+
+def make_row(cells):
+    """Convert the cells of a row for storage
+
+    Only the raw values are stored together with the UID of the converter
+    context if it is not the row object. The values are converted when the
+    row is rendered, because converted values, e.g. links with the CSRF
+    token, depend on the current user.
+
+    :param cells: list of (value, context, brain) tuples of the row
+    :returns: tuple of (value, context UID or None) tuples
+    """
+    return tuple(map(
+        lambda cell: (make_storable(cell[0]),
+                      None if cell[2] is not None else api.get_uid(cell[1])),
+        cells))
+
+
+def get_row_refs(uid, row):
+    """Returns the UIDs of the converter contexts of the row
+
+    These are the objects the values of the row were read from, e.g. the
+    referenced client or the parent of the row object.
+    """
+    refs = set(filter(None, map(lambda cell: cell[1], row)))
+    refs.discard(uid)
+    return refs
+
+
+def set_row(storage, uid, row):
+    """Store the row and index the UIDs it references
+    """
+    del_row(storage, uid)
+    storage["rows"][uid] = row
+    refs = storage["refs"]
+    for ref in get_row_refs(uid, row):
+        if ref not in refs:
+            refs[ref] = OOTreeSet()
+        refs[ref].insert(uid)
+
+
+def del_row(storage, uid):
+    """Remove the row and its references from the storage
+    """
+    row = storage["rows"].pop(uid, None)
+    if row is None:
+        return
+    refs = storage["refs"]
+    for ref in get_row_refs(uid, row):
+        rows = refs.get(ref)
+        if rows is None:
+            continue
+        rows.remove(uid)
+        if not rows:
+            del refs[ref]
+
+
+def get_referencing(databox, uids):
+    """Returns the UIDs of the rows that show values of the given objects
+    """
+    storage = get_storage(databox)
+    if storage is None or "refs" not in storage:
+        return set()
+    refs = storage["refs"]
+    found = set()
+    for uid in uids:
+        found.update(refs.get(uid, ()))
+    return found
+
+
+def get_view(databox):
+    """Returns the databox view to extract the rows
+    """
+    view = api.get_view("view", context=databox, request=api.get_request())
+    # the models of the request might be outdated by the changes to store
+    view.share_models = False
+    view.inflate_params()
+    return view
+
+
+def get_query(databox, **kw):
+    """Returns the catalog query for all objects of the databox
+    """
+    query = IDataBoxBehavior(databox).query
+    for key in ("sort_on", "sort_order", "sort_limit"):
+        query.pop(key, None)
+    query.update(kw)
+    return query
+
+
+def iter_rows(view, brains):
+    """Iterate over the brains and the cells of their rows
+    """
+    for brain in brains:
+        obj = brain._unrestrictedGetObject()
+        yield brain, view.get_row_cells(brain, obj=obj)
+
+
+def build(databox):
+    """Extract all rows of the databox into a new snapshot
+
+    :returns: number of materialized rows
+    """
+    clear(databox)
+    storage = get_storage(databox, create=True)
+    catalog = IDataBoxBehavior(databox).get_catalog_tool()
+    view = get_view(databox)
+    brains = catalog.unrestrictedSearchResults(get_query(databox))
+    for brain, cells in iter_rows(view, brains):
+        set_row(storage, brain.UID, make_row(cells))
+    storage["config"] = get_config_key(databox)
+    rows = len(storage["rows"])
+    logger.info("Materialized {} rows of {}".format(
+        rows, api.get_path(databox)))
+    return rows
+
+
+def rebuild(databox):
+    """Rebuild the snapshot of the databox in a separate transaction
+
+    The snapshot is only rebuilt by one thread at a time, other threads
+    extract the rows from the objects in the meantime.
+
+    :returns: True if the rebuilt snapshot was committed
+    """
+    uid = api.get_uid(databox)
+    with _building_lock:
+        if uid in _building:
+            return False
+        _building.add(uid)
+    parent = aq_parent(aq_inner(databox))
+
+    def write(databox):
+        # the views of the rows need the acquisition chain
+        build(aq_base(databox).__of__(parent))
+
+    try:
+        return commit_in_separate_transaction(databox, write)
+    except Exception as exc:
+        logger.error("Failed to rebuild snapshot of {}: {}".format(
+            api.get_path(databox), repr(exc)))
+        return False
+    finally:
+        with _building_lock:
+            _building.discard(uid)
+
+
+def update(databox, uids):
+    """Update the rows of the given UIDs in the snapshot of the databox
+
+    Rows of objects that no longer match the databox query are removed.
+    """
+    storage = get_storage(databox)
+    if storage is None or not is_current(databox):
+        # the snapshot is rebuilt when the databox is modified
+        return
+    catalog = IDataBoxBehavior(databox).get_catalog_tool()
+    view = get_view(databox)
+    query = get_query(databox, UID=list(uids))
+    matched = set()
+    brains = catalog.unrestrictedSearchResults(query)
+    for brain, cells in iter_rows(view, brains):
+        set_row(storage, brain.UID, make_row(cells))
+        matched.add(brain.UID)
+    for uid in set(uids).difference(matched):
+        del_row(storage, uid)
+
+
+def get_registry(create=False):
+    """Returns the mapping of query type -> UIDs of materialized databoxes
+    """
+    annotations = IAnnotations(api.get_portal())
+    registry = annotations.get(SNAPSHOT_REGISTRY)
+    if registry is None and create:
+        registry = annotations[SNAPSHOT_REGISTRY] = PersistentMapping()
+    return registry
+
+
+def get_materialized(portal_type):
+    """Returns the UIDs of the materialized databoxes of the portal type
+    """
+    registry = get_registry()
+    if not registry:
+        return ()
+    return registry.get(portal_type, ())
+
+
+def update_registry(databox, remove=False):
+    """Register or unregister the materialized databox for its query type
+    """
+    uid = api.get_uid(databox)
+    adapter = IDataBoxBehavior(databox)
+    materialized = adapter.materialized and not remove
+    registry = get_registry(create=materialized)
+    if registry is None:
+        return
+
+    # remove the databox from all query types, it might have changed
+    for portal_type, uids in registry.items():
+        if uid in uids:
+            uids = tuple(filter(lambda u: u != uid, uids))
+            registry[portal_type] = uids
+        if not registry[portal_type]:
+            del registry[portal_type]
+
+    if materialized:
+        query_type = adapter.query_type
+        registry[query_type] = registry.get(query_type, ()) + (uid, )
+
+
+def queue(obj):
+    """Queue the object to update the snapshots before the transaction commits
+
+    Objects of all types are queued, because they might be referenced by the
+    rows of a materialized databox.
+    """
+    if not get_registry():
+        return
+    txn = transaction.get()
+    pending = _pending.get(txn)
+    if pending is None:
+        pending = _pending[txn] = {}
+        txn.addBeforeCommitHook(process, args=(pending, ))
+    pending.setdefault(api.get_portal_type(obj), set()).add(api.get_uid(obj))
+
+
+def get_databox(uid):
+    """Returns the databox object of the UID without security checks
+    """
+    catalog = api.get_tool("portal_catalog")
+    brains = catalog.unrestrictedSearchResults(UID=uid)
+    if len(brains) != 1:
+        return None
+    return brains[0]._unrestrictedGetObject()
+
+
+def process(pending):
+    """Update the snapshots of the materialized databoxes
+
+    The rows of the changed objects of the queried type are updated together
+    with the rows that show values of any changed object.
+    """
+    registry = get_registry() or {}
+    changed = set()
+    for uids in pending.values():
+        changed.update(uids)
+    for databox_uid in set(sum(registry.values(), ())):
+        databox = get_databox(databox_uid)
+        if databox is None:
+            continue
+        query_type = IDataBoxBehavior(databox).query_type
+        uids = set(pending.get(query_type, ()))
+        uids.update(get_referencing(databox, changed))
+        if not uids:
+            continue
+        try:
+            update(databox, uids)
+        except Exception as exc:
+            logger.error("Failed to update snapshot of {}: {}".format(
+                api.get_path(databox), repr(exc)))
+            # drop the rows to extract them again on the next view
+            storage = get_storage(databox)
+            for uid in uids:
+                del_row(storage, uid)
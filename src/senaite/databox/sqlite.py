@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""SQLite database export
+
+Every databox is written into a typed table of the database. The rows are
+inserted in batches within one transaction.
+"""
+
+import os
+import re
+import sqlite3
+import tempfile
+
+from bika.lims import api
+from datetime import date
+from itertools import islice
+from senaite.databox import datatypes
+from senaite.databox.config import SQLITE_BATCH_SIZE
+
+SQL_TYPES = {
+    datatypes.BOOL: "INTEGER",
+    datatypes.INT: "INTEGER",
+    datatypes.FLOAT: "REAL",
+    # SQLite has no date types, dates are stored as ISO 8601 strings
+    datatypes.DATE: "TEXT",
+    datatypes.DATETIME: "TEXT",
+    datatypes.STRING: "TEXT",
+}
+
+
+def quote(name):
+    """Quote the identifier
+    """
+    return u'"{}"'.format(api.safe_unicode(name).replace(u'"', u'""'))
+
+
+def get_names(titles, default=u"column"):
+    """Returns unique names for the given titles
+    """
+    names = []
+    for title in titles:
+        name = re.sub(r"\s+", u"_", api.safe_unicode(title or u"").strip())
+        name = name or default
+        unique = name
+        num = 1
+        while unique.lower() in map(lambda n: n.lower(), names):
+            num += 1
+            unique = u"{}_{}".format(name, num)
+        names.append(unique)
+    return names
+
+
+def to_sql(value):
+    """Convert the cast value of a column to a SQLite value
+    """
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def write_table(connection, name, columns, indexes=None):
+    """Create the table of the columns and insert the rows
+
+    :param connection: SQLite connection
+    :param name: name of the table
+    :param columns: `senaite.databox.datatypes.Columns` of the rows
+    :param indexes: titles of the columns to index
+    """
+    names = get_names(columns.names)
+    types = []
+    values = []
+    for title, column_type, cast_values in columns.get_columns():
+        types.append(SQL_TYPES.get(column_type, "TEXT"))
+        values.append(cast_values)
+
+    definition = u", ".join(map(
+        lambda item: u"{} {}".format(quote(item[0]), item[1]),
+        zip(names, types)))
+    connection.execute(u"CREATE TABLE {} ({})".format(
+        quote(name), definition))
+
+    if names:
+        insert = u"INSERT INTO {} VALUES ({})".format(
+            quote(name), u", ".join([u"?"] * len(names)))
+        rows = (map(to_sql, row) for row in zip(*values))
+        while True:
+            batch = list(islice(rows, SQLITE_BATCH_SIZE))
+            if not batch:
+                break
+            connection.executemany(insert, batch)
+
+    for title in indexes or []:
+        if title not in columns.names:
+            continue
+        column = names[columns.names.index(title)]
+        connection.execute(u"CREATE INDEX {} ON {} ({})".format(
+            quote(u"{}_{}".format(name, column)), quote(name),
+            quote(column)))
+
+
+def to_sqlite(tables, indexes=None):
+    """Returns a SQLite database with a table for each of the given columns
+
+    :param tables: list of table title and columns tuples
+    :param indexes: titles of the columns to index in every table
+    :returns: SQLite database file contents
+    """
+    handle, path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(handle)
+    try:
+        connection = sqlite3.connect(path)
+        # manage the transaction explicitly
+        connection.isolation_level = None
+        try:
+            connection.execute("BEGIN")
+            names = get_names(map(lambda table: table[0], tables), u"table")
+            for name, (title, columns) in zip(names, tables):
+                write_table(connection, name, columns, indexes=indexes)
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        with open(path, "rb") as database:
+            return database.read()
+    finally:
+        os.remove(path)
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Lightweight execution statistics of databoxes
+
+The statistics of the last execution are kept per databox in the
+annotations of the databox folder and are written in a separate
+transaction, so that the databox itself is not modified by its executions.
+Executions of different databoxes modify different records, concurrent
+executions of the same databox are resolved to the latest run.
+
+The executions are aggregated in memory and written periodically or when
+enough executions are pending, instead of committing every execution.
+"""
+
+import threading
+import time
+
+from bika.lims import api
+from BTrees.OOBTree import OOBTree
+from DateTime import DateTime
+from persistent import Persistent
+from senaite.databox import logger
+from senaite.databox.config import STATS_STORAGE
+from senaite.databox.utils import commit_in_separate_transaction
+from senaite.databox.utils import get_setting
+from zope.annotation.interfaces import IAnnotations
+
+
+class ExecutionStats(Persistent):
+    """The statistics of the last execution of a databox
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.last_run = 0.0
+        self.execution = None
+        self.duration = 0.0
+        self.rows = 0
+        self.loads = 0
+        self.hit_rate = 0.0
+
+    def update(self, **info):
+        """Set the statistics of a new execution
+        """
+        self.merge(1, time.time(), info)
+
+    def merge(self, runs, last_run, info):
+        """Add the aggregated statistics of executions
+
+        :param runs: number of executions
+        :param last_run: time of the latest execution
+        :param info: statistics of the latest execution
+        """
+        self.runs += runs
+        self.last_run = last_run
+        for key, value in info.items():
+            setattr(self, key, value)
+
+    def get_last_run(self):
+        """Returns the date of the last execution or None
+        """
+        if not self.last_run:
+            return None
+        return DateTime(self.last_run)
+
+    def to_dict(self):
+        return {
+            "runs": self.runs,
+            "last_run": self.get_last_run(),
+            "execution": self.execution,
+            "duration": self.duration,
+            "rows": self.rows,
+            "loads": self.loads,
+            "hit_rate": self.hit_rate,
+        }
+
+    def _p_resolveConflict(self, old, committed, new):
+        """Keep the statistics of the latest run and count all runs
+        """
+        latest = committed
+        if new.get("last_run", 0) >= committed.get("last_run", 0):
+            latest = new
+        state = dict(latest)
+        state["runs"] = (committed.get("runs", 0) + new.get("runs", 0) -
+                         old.get("runs", 0))
+        return state
+
+
+class PendingStats(object):
+    """Statistics of the executions that are not yet written, per folder
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.folders = {}
+
+    def add(self, key, uid, info, interval=0, size=0):
+        """Add the statistics of an execution of the databox
+
+        :param key: key of the databox folder
+        :param uid: UID of the databox
+        :param info: statistics of the execution
+        :param interval: seconds between the writes of the folder
+        :param size: number of pending executions that are written at once
+        :returns: True if the pending statistics of the folder are due
+        """
+        now = time.time()
+        with self.lock:
+            folder = self.folders.setdefault(
+                key, {"flushed": 0.0, "count": 0, "stats": {}})
+            pending = folder["stats"].setdefault(
+                uid, {"runs": 0, "last_run": 0.0, "info": {}})
+            pending["runs"] += 1
+            pending["last_run"] = now
+            pending["info"] = info
+            folder["count"] += 1
+            if size and folder["count"] >= size:
+                return True
+            return now - folder["flushed"] >= interval
+
+    def get(self, key):
+        """Returns a copy of the pending statistics of the folder by UID
+        """
+        with self.lock:
+            folder = self.folders.get(key)
+            if folder is None:
+                return {}
+            return dict(map(lambda item: (item[0], dict(item[1])),
+                            folder["stats"].items()))
+
+    def pop(self, key):
+        """Remove and return the pending statistics of the folder by UID
+        """
+        with self.lock:
+            folder = self.folders.get(key)
+            if folder is None:
+                return {}
+            stats = folder["stats"]
+            folder.update({"flushed": time.time(), "count": 0, "stats": {}})
+            return stats
+
+    def restore(self, key, stats):
+        """Put back the popped statistics of the folder that were not written
+
+        The statistics of executions that were added in the meantime are
+        newer and kept together with the restored runs.
+        """
+        with self.lock:
+            folder = self.folders.setdefault(
+                key, {"flushed": 0.0, "count": 0, "stats": {}})
+            for uid, value in stats.items():
+                current = folder["stats"].get(uid)
+                if current is None:
+                    folder["stats"][uid] = value
+                else:
+                    current["runs"] += value["runs"]
+                folder["count"] += value["runs"]
+
+    def clear(self):
+        with self.lock:
+            self.folders.clear()
+
+
+# Pending statistics of this process, see `record`
+pending = PendingStats()
+
+
+def is_enabled():
+    """Checks if the execution statistics are recorded
+    """
+    return get_setting("databox_execution_stats", True)
+
+
+def get_storage(folder, create=False):
+    """Returns the statistics of the databoxes of the folder by UID
+    """
+    annotations = IAnnotations(folder)
+    storage = annotations.get(STATS_STORAGE)
+    if storage is None and create:
+        storage = annotations[STATS_STORAGE] = OOBTree()
+    return storage
+
+
+def get_key(folder):
+    """Returns the key of the pending statistics of the folder
+    """
+    return api.get_path(folder)
+
+
+def get_stats(folder):
+    """Returns the statistics of the databoxes of the folder
+
+    The pending statistics of this process are included.
+
+    :returns: mapping of UID -> statistics dictionary
+    """
+    storage = get_storage(folder) or {}
+    stats = dict(map(lambda item: (item[0], item[1].to_dict()),
+                     storage.items()))
+    for uid, value in pending.get(get_key(folder)).items():
+        info = stats.get(uid) or ExecutionStats().to_dict()
+        info.update(value["info"])
+        info["runs"] += value["runs"]
+        info["last_run"] = DateTime(value["last_run"])
+        stats[uid] = info
+    return stats
+
+
+def clear(folder):
+    """Remove the statistics of all databoxes of the folder
+    """
+    pending.pop(get_key(folder))
+    annotations = IAnnotations(folder)
+    if STATS_STORAGE in annotations:
+        del annotations[STATS_STORAGE]
+
+
+def record(databox, **info):
+    """Record the statistics of an execution of the databox
+
+    The statistics are kept in memory until the flush interval of the folder
+    has passed or the number of pending executions is reached.
+
+    :param databox: DataBox content object
+    :param info: execution statistics, e.g. duration, rows and loads
+    :returns: True if the statistics were written
+    """
+    folder = api.get_parent(databox)
+    due = pending.add(
+        get_key(folder), api.get_uid(databox), info,
+        interval=get_setting("databox_stats_flush_interval", 60.0),
+        size=get_setting("databox_stats_flush_size", 100))
+    if not due:
+        return False
+    return flush(folder)
+
+
+def flush(folder):
+    """Write the pending statistics of the folder in a separate transaction
+
+    :returns: True if the statistics were written
+    """
+    key = get_key(folder)
+    stats = pending.pop(key)
+    if not stats:
+        return False
+    written = []
+
+    def write(obj):
+        storage = get_storage(obj, create=True)
+        for uid, value in stats.items():
+            record = storage.get(uid)
+            if record is None:
+                record = storage[uid] = ExecutionStats()
+            record.merge(value["runs"], value["last_run"], value["info"])
+        written.append(obj)
+
+    try:
+        committed = commit_in_separate_transaction(folder, write)
+    except Exception as exc:
+        logger.error("Failed to write execution statistics of {}: {}"
+                     .format(repr(folder), repr(exc)))
+        committed = False
+    if not committed and not any(map(lambda obj: obj is folder, written)):
+        # keep the statistics for the next flush, unless they were written
+        # to the folder of the current transaction
+        pending.restore(key, stats)
+    return committed
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+"""Streaming of compressed exports
+
+The exported data is compressed on the fly and written to the response in
+chunks instead of being assembled in memory first.
+"""
+
+import struct
+import threading
+import time
+import zlib
+
+from bika.lims import api
+
+# Compression level of gzip and zip streams
+COMPRESSION_LEVEL = 6
+
+# zlib window bits for gzip streams with header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# zlib window bits for raw deflate streams of zip entries
+DEFLATE_WBITS = -zlib.MAX_WBITS
+
+# Flags of the zip entries: data descriptor after the data, UTF-8 names
+ZIP_FLAGS = 0x08 | 0x800
+ZIP_VERSION = 20
+ZIP_DEFLATED = 8
+
+# Limits of zip archives without ZIP64 extensions
+ZIP_MAX_SIZE = 0xffffffff
+ZIP_MAX_ENTRIES = 0xffff
+
+
+class ZipLimitExceeded(Exception):
+    """Raised when a zip archive exceeds the limits of the zip format
+    """
+
+    def __init__(self, name, limit, value):
+        self.name = name
+        self.limit = limit
+        self.value = value
+        super(ZipLimitExceeded, self).__init__(
+            "Zip {} limit of {} exceeded ({})".format(name, limit, value))
+
+
+def get_quality(value):
+    """Returns the quality value of an Accept-Encoding item, e.g. `q=0.5`
+    """
+    for param in value.split(";")[1:]:
+        name, _, quality = param.partition("=")
+        if name.strip().lower() != "q":
+            continue
+        try:
+            return float(quality)
+        except ValueError:
+            return 0.0
+    return 1.0
+
+
+def accepts_gzip(request):
+    """Checks if the client accepts gzip encoded responses
+
+    Encodings with a quality value of 0 are not acceptable. An explicit gzip
+    item takes precedence over the `*` wildcard.
+    """
+    accept = request.getHeader("Accept-Encoding", "") or ""
+    qualities = {}
+    for item in accept.split(","):
+        name = item.split(";")[0].strip().lower()
+        if name:
+            qualities[name] = get_quality(item)
+    quality = qualities.get("gzip", qualities.get("*", 0))
+    return quality > 0
+
+
+class Output(object):
+    """Collects the output of any thread and writes it to the response
+
+    The response must only be written from the request thread, therefore the
+    collected output is written by calling `drain` in the request thread.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.lock = threading.Lock()
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        if not data:
+            return
+        with self.lock:
+            self.chunks.append(data)
+
+    def drain(self):
+        """Write the collected output to the response
+        """
+        with self.lock:
+            data = "".join(self.chunks)
+            self.chunks = []
+        if data:
+            self.size += len(data)
+            self.response.write(data)
+
+    def close(self):
+        self.drain()
+
+
+class GzipWriter(object):
+    """Compresses the written data into a gzip stream
+    """
+
+    def __init__(self, write, level=COMPRESSION_LEVEL):
+        self.output = write
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+
+    def write(self, data):
+        self.output(self.compressor.compress(data))
+
+    def close(self):
+        self.output(self.compressor.flush())
+
+
+def get_dos_time(timestamp):
+    """Returns the MS-DOS time and date of the timestamp
+    """
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipEntry(object):
+    """A file of a zip archive that is compressed as it is written
+    """
+
+    def __init__(self, archive, name, level=COMPRESSION_LEVEL):
+        archive.check("entry count", len(archive.entries) + 1,
+                      archive.max_entries)
+        archive.check("offset", archive.offset, archive.max_size)
+        self.archive = archive
+        self.name = api.safe_unicode(name).encode("utf8")
+        self.offset = archive.offset
+        self.dos_time, self.dos_date = get_dos_time(time.time())
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.compressor = zlib.compressobj(
+            level, zlib.DEFLATED, DEFLATE_WBITS)
+        # the sizes and the checksum follow in the data descriptor
+        header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034b50, ZIP_VERSION, ZIP_FLAGS, ZIP_DEFLATED,
+            self.dos_time, self.dos_date, 0, 0, 0, len(self.name), 0)
+        archive.output(header + self.name)
+
+    def output(self, data):
+        self.compressed_size += len(data)
+        self.archive.check("compressed file size", self.compressed_size,
+                           self.archive.max_size)
+        self.archive.output(data)
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc) & 0xffffffff
+        self.size += len(data)
+        self.archive.check("file size", self.size, self.archive.max_size)
+        self.output(self.compressor.compress(data))
+
+    def close(self):
+        self.output(self.compressor.flush())
+        self.archive.output(struct.pack(
+            "<IIII", 0x08074b50, self.crc, self.compressed_size, self.size))
+        self.archive.entries.append(self)
+
+
+class ZipWriter(object):
+    """Writes a zip archive as a stream
+
+    The files of the archive are written one after the other, the central
+    directory is written when the archive is closed.
+
+    ZIP64 extensions are not written, therefore archives that exceed the
+    limits of the zip format raise `ZipLimitExceeded` instead of writing a
+    corrupt archive.
+    """
+
+    # Limits of the archive
+    max_size = ZIP_MAX_SIZE
+    max_entries = ZIP_MAX_ENTRIES
+
+    def __init__(self, write):
+        self.write = write
+        self.offset = 0
+        self.entries = []
+
+    def output(self, data):
+        self.offset += len(data)
+        self.write(data)
+
+    def check(self, name, value, limit):
+        """Raise `ZipLimitExceeded` if the value exceeds the limit
+        """
+        if value > limit:
+            raise ZipLimitExceeded(name, limit, value)
+
+    def open(self, name):
+        """Add a new file to the archive
+
+        :param name: name of the file in the archive
+        :returns: `ZipEntry` to write the file contents
+        """
+        return ZipEntry(self, name)
+
+    def close(self):
+        """Write the central directory
+        """
+        start = self.offset
+        self.check("offset", start, self.max_size)
+        for entry in self.entries:
+            header = struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014b50, ZIP_VERSION, ZIP_VERSION,
+                ZIP_FLAGS, ZIP_DEFLATED, entry.dos_time, entry.dos_date,
+                entry.crc, entry.compressed_size, entry.size,
+                len(entry.name), 0, 0, 0, 0, 0, entry.offset)
+            self.output(header + entry.name)
+        self.check("central directory size", self.offset - start,
+                   self.max_size)
+        self.output(struct.pack(
+            "<IHHHHIIH", 0x06054b50, 0, 0, len(self.entries),
+            len(self.entries), self.offset - start, start, 0))
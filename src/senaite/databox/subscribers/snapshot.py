@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from bika.lims import api
+from senaite.databox import snapshot
+from senaite.databox.behaviors.databox import IDataBoxBehavior
+
+
+def on_object_changed(obj, event):
+    """Event handler for added, modified, transitioned and removed objects
+
+    Queues the object to update the rows of the materialized databoxes of its
+    type and the rows that reference it.
+    """
+    if api.get_portal_type(obj) == "DataBox":
+        return
+    snapshot.queue(obj)
+
+
+def on_databox_modified(databox, event):
+    """Event handler when a databox was modified
+
+    Registers the materialized databox for its query type and drops the
+    snapshot if the configuration of the rows has changed. The snapshot is
+    rebuilt by the next view of the databox and not in the saving request.
+    """
+    snapshot.update_registry(databox)
+    materialized = IDataBoxBehavior(databox).materialized
+    if not materialized or not snapshot.is_current(databox):
+        snapshot.clear(databox)
+
+
+def on_databox_removed(databox, event):
+    """Event handler when a databox was removed
+    """
+    snapshot.update_registry(databox, remove=True)
@@ -22,7 +22,9 @@ from plone.app.testing import TEST_USER_ID
 from plone.app.testing import setRoles
 from plone.app.testing.bbb_at import PloneTestCase
 from plone.protect.authenticator import createToken
+from senaite.databox import stats
 from senaite.databox.tests.layers import BASE_TESTING
+from senaite.databox.tests.layers import SAMPLES_TESTING
 
 
 class BaseTestCase(PloneTestCase):
@@ -46,3 +48,12 @@ class BaseTestCase(PloneTestCase):
         # => This causes an `AttributeError` when we want to access
         #    e.g. 'guard_handler' FSPythonScript
         self.portal.changeSkin("Plone Default")
+
+        # Discard the execution statistics kept in memory by previous tests
+        stats.pending.clear()
+
+
+class SamplesTestCase(BaseTestCase):
+    """Use for test cases which rely on the generated samples
+    """
+    layer = SAMPLES_TESTING
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Synthetic data generator and benchmark helpers for DataBox throughput
+
+The helpers in this module are used by `test_benchmark` to populate a test
+site with a configurable volume of Clients, Samples and Analyses and to
+measure the throughput of the DataBox execution stages.
+"""
+
+import json
+import os
+import resource
+import time
+
+from bika.lims import api
+from bika.lims.utils.analysisrequest import create_analysisrequest
+from bika.lims.workflow import doActionFor as do_action_for
+from DateTime import DateTime
+from senaite.databox.behaviors.databox import IDataBoxBehavior
+from zope.component import getMultiAdapter
+
+# Environment variables to control the generated data volume
+ENV_CLIENTS = "DATABOX_BENCHMARK_CLIENTS"
+ENV_SAMPLES = "DATABOX_BENCHMARK_SAMPLES"
+ENV_ANALYSES = "DATABOX_BENCHMARK_ANALYSES"
+ENV_OUTPUT = "DATABOX_BENCHMARK_OUTPUT"
+
+DEFAULT_CLIENTS = 2
+DEFAULT_SAMPLES = 10
+DEFAULT_ANALYSES = 3
+
+
+def get_env_int(name, default):
+    """Returns the integer value of the environment variable
+    """
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return api.to_int(value, default=default)
+
+
+def get_peak_memory():
+    """Returns the peak resident set size of the process in kilobytes
+
+    N.B. This is the high-water mark of the whole process and can not be
+         reset, therefore the benchmark reports the growth per stage.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class DataGenerator(object):
+    """Generates Clients, Samples and Analyses in a test site
+    """
+
+    def __init__(self, portal, request):
+        self.portal = portal
+        self.request = request
+        self.setup = portal.setup
+        self.bikasetup = portal.bika_setup
+        self.services = []
+        self.sampletype = None
+
+    def generate(self, clients=DEFAULT_CLIENTS, samples=DEFAULT_SAMPLES,
+                 analyses=DEFAULT_ANALYSES):
+        """Generate the data
+
+        :param clients: number of clients to create
+        :param samples: number of samples per client
+        :param analyses: number of analyses per sample
+        :returns: number of created samples
+        """
+        self.setup_lab(analyses)
+        created = 0
+        for num in range(clients):
+            client = api.create(
+                self.portal.clients, "Client",
+                Name="Client {}".format(num),
+                ClientID="C{}".format(num))
+            contact = api.create(
+                client, "Contact", Firstname="Contact", Lastname=str(num))
+            for sample in range(samples):
+                self.create_sample(client, contact)
+                created += 1
+        return created
+
+    def load(self):
+        """Load the setup items of the data generated before, e.g. by the
+        samples test layer
+
+        :returns: number of existing samples
+        """
+        sampletypes = filter(lambda obj: api.get_title(obj) == "Benchmark",
+                             self.setup.sampletypes.objectValues())
+        self.sampletype = sampletypes[0] if sampletypes else None
+        services = self.bikasetup.bika_analysisservices.objectValues()
+        self.services = sorted(
+            filter(lambda obj: obj.getKeyword().startswith("BM"), services),
+            key=lambda obj: obj.getKeyword())
+        query = {"portal_type": "AnalysisRequest"}
+        return len(api.search(query, "senaite_catalog_sample"))
+
+    def setup_lab(self, analyses):
+        """Create the setup items needed for samples
+        """
+        self.bikasetup.setSelfVerificationEnabled(True)
+        labcontact = api.create(
+            self.bikasetup.bika_labcontacts, "LabContact",
+            Firstname="Lab", Lastname="Manager")
+        department = api.create(
+            self.setup.departments, "Department",
+            title="Benchmark", Manager=labcontact)
+        category = api.create(
+            self.setup.analysiscategories, "AnalysisCategory",
+            title="Benchmark", Department=department)
+        self.sampletype = api.create(
+            self.setup.sampletypes, "SampleType",
+            title="Benchmark", Prefix="BM")
+        for num in range(analyses):
+            keyword = "BM{}".format(num)
+            service = api.create(
+                self.bikasetup.bika_analysisservices, "AnalysisService",
+                title="Service {}".format(num), Keyword=keyword,
+                Price="10", Category=category.UID())
+            self.services.append(service)
+
+    def create_sample(self, client, contact):
+        """Create and receive a sample
+        """
+        values = {
+            "Client": api.get_uid(client),
+            "Contact": api.get_uid(contact),
+            "DateSampled": DateTime().strftime("%Y-%m-%d"),
+            "SampleType": api.get_uid(self.sampletype),
+        }
+        service_uids = map(api.get_uid, self.services)
+        sample = create_analysisrequest(
+            client, self.request, values, service_uids)
+        do_action_for(sample, "receive")
+        return sample
+
+    def create_databox(self, title, query_type, columns=None, params=None,
+                       limit=1000):
+        """Create a new databox in the databoxes folder
+        """
+        databox = api.create(self.portal.databoxes, "DataBox", title=title)
+        adapted = IDataBoxBehavior(databox)
+        adapted.query_type = query_type
+        adapted.limit = limit
+        adapted.date_index = None
+        adapted.columns = columns or []
+        adapted.params = params or []
+        return databox
+
+    def get_view(self, databox):
+        """Returns the DataBox view
+        """
+        return getMultiAdapter((databox, self.request), name="view")
+
+
+class Benchmark(object):
+    """Collects machine-readable timings and memory usage
+    """
+
+    def __init__(self, **info):
+        self.info = info
+        self.results = []
+
+    def measure(self, name, func, *args, **kw):
+        """Call the function and record its throughput
+
+        The function is expected to return the number of processed rows.
+        """
+        memory = get_peak_memory()
+        start = time.time()
+        rows = func(*args, **kw)
+        duration = time.time() - start
+        peak = get_peak_memory()
+        result = {
+            "name": name,
+            "rows": rows,
+            "seconds": round(duration, 6),
+            "rows_per_second": round(rows / duration, 2) if duration else 0,
+            "peak_memory_kb": peak,
+            "peak_memory_growth_kb": peak - memory,
+        }
+        self.results.append(result)
+        return result
+
+    def to_dict(self):
+        return {
+            "info": self.info,
+            "created": DateTime().ISO8601(),
+            "results": self.results,
+        }
+
+    def dump(self, path):
+        """Write the results as JSON
+        """
+        with open(path, "w") as fp:
+            json.dump(self.to_dict(), fp, indent=2, sort_keys=True)
+        return path
@@ -90,6 +90,25 @@ class DataLayer(BaseLayer):
         self.setup_data_load(portal, portal.REQUEST)
 
 
+class SamplesLayer(BaseLayer):
+    """Layer including generated Samples
+
+    One client with 3 received samples of one analysis each, see
+    `senaite.databox.tests.benchmark.DataGenerator`
+    """
+
+    def setUpPloneSite(self, portal):
+        super(SamplesLayer, self).setUpPloneSite(portal)
+
+        from senaite.databox.tests.benchmark import DataGenerator
+
+        login(portal.aq_parent, SITE_OWNER_NAME)
+        generator = DataGenerator(portal, portal.REQUEST)
+        generator.generate(clients=1, samples=3, analyses=1)
+        logout()
+        transaction.commit()
+
+
 BASE_LAYER_FIXTURE = BaseLayer()
 BASE_TESTING = FunctionalTesting(
     bases=(BASE_LAYER_FIXTURE,), name="SENAITE.DATABOX:BaseTesting")
@@ -97,3 +116,7 @@ BASE_TESTING = FunctionalTesting(
 DATA_LAYER_FIXTURE = DataLayer()
 DATA_TESTING = FunctionalTesting(
     bases=(DATA_LAYER_FIXTURE,), name="SENAITE.DATABOX:DataTesting")
+
+SAMPLES_LAYER_FIXTURE = SamplesLayer()
+SAMPLES_TESTING = FunctionalTesting(
+    bases=(SAMPLES_LAYER_FIXTURE,), name="SENAITE.DATABOX:SamplesTesting")
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import os
+import sys
+
+import unittest2 as unittest
+from DateTime import DateTime
+from Products.ATContentTypes.utils import DT2dt
+from Products.PluginIndexes.FieldIndex.FieldIndex import FieldIndex
+from Products.ZCatalog.Catalog import Catalog
+from senaite.core.registry import set_registry_record
+from senaite.databox.dates import DateFormatter
+from senaite.databox.tests.base import BaseTestCase
+from senaite.databox.tests.benchmark import DEFAULT_ANALYSES
+from senaite.databox.tests.benchmark import DEFAULT_CLIENTS
+from senaite.databox.tests.benchmark import DEFAULT_SAMPLES
+from senaite.databox.tests.benchmark import ENV_ANALYSES
+from senaite.databox.tests.benchmark import ENV_CLIENTS
+from senaite.databox.tests.benchmark import ENV_OUTPUT
+from senaite.databox.tests.benchmark import ENV_SAMPLES
+from senaite.databox.tests.benchmark import Benchmark
+from senaite.databox.tests.benchmark import DataGenerator
+from senaite.databox.tests.benchmark import get_env_int
+
+SAMPLE_COLUMNS = [
+    {"getId": {"column": "getId", "title": "ID"}},
+    {"Client": {"column": "Client", "title": "Client", "refs": ["title"]}},
+    {"Contact": {"column": "Contact", "title": "Contact",
+                 "refs": ["title"]}},
+    {"SampleType": {"column": "SampleType", "title": "Sample Type",
+                    "refs": ["title"]}},
+    {"created": {"column": "created", "title": "Created",
+                 "converter": "senaite.databox.to_date"}},
+]
+
+ANALYSIS_COLUMNS = [
+    {"Keyword": {"column": "Keyword", "title": "Keyword"}},
+    {"Result": {"column": "Result", "title": "Result"}},
+    {"Parent": {"column": "Parent", "title": "Sample",
+                "refs": ["title"]}},
+    {"created": {"column": "created", "title": "Created",
+                 "converter": "senaite.databox.to_long_date"}},
+]
+
+PARAMS = [{"name": "p0", "type": "int", "value": "1"}] + [
+    {"name": "p{}".format(num),
+     "type": "expression",
+     "value": "parameters['p{}'] + 1".format(num - 1)}
+    for num in range(1, 20)]
+
+# Number of parameter inflations to measure
+PARAMS_ITERATIONS = 500
+
+# Catalog sizes and sort limit for the sort limit benchmark
+SORT_SIZES = (5000, 40000)
+SORT_LIMIT = 10
+
+# Number of dates and distinct dates for the date format benchmark
+DATE_VALUES = 20000
+DATE_DISTINCT = 100
+DATE_FORMAT = "%d.%m.%Y %H:%M"
+
+
+class TestBenchmark(BaseTestCase):
+    """Throughput benchmarks for DataBox executions
+
+    The benchmarks are skipped in the default test run and need to be enabled
+    with the test level option, e.g.:
+
+        bin/test -s senaite.databox -t test_benchmark -a 2
+
+    The data volume is controlled by the environment variables
+    `DATABOX_BENCHMARK_CLIENTS`, `DATABOX_BENCHMARK_SAMPLES` (per client) and
+    `DATABOX_BENCHMARK_ANALYSES` (per sample). The results are only written
+    as JSON if a file is given in `DATABOX_BENCHMARK_OUTPUT`.
+    """
+    level = 2
+
+    def setUp(self):
+        super(TestBenchmark, self).setUp()
+        clients = get_env_int(ENV_CLIENTS, DEFAULT_CLIENTS)
+        samples = get_env_int(ENV_SAMPLES, DEFAULT_SAMPLES)
+        analyses = get_env_int(ENV_ANALYSES, DEFAULT_ANALYSES)
+        self.generator = DataGenerator(self.portal, self.request)
+        self.generator.generate(
+            clients=clients, samples=samples, analyses=analyses)
+        self.benchmark = Benchmark(
+            clients=clients, samples=samples, analyses=analyses)
+        self.expected = {
+            "AnalysisRequest": clients * samples,
+            "Analysis": clients * samples * analyses,
+        }
+        # the budget must not truncate large data volumes
+        for name in ("max_rows", "max_seconds", "max_loads"):
+            set_registry_record("databox_{}".format(name), 0)
+
+    def tearDown(self):
+        path = os.environ.get(ENV_OUTPUT)
+        if path:
+            self.benchmark.dump(path)
+        super(TestBenchmark, self).tearDown()
+
+    def get_view(self, query_type, columns, params=None):
+        databox = self.generator.create_databox(
+            query_type, query_type, columns=columns, params=params)
+        return self.generator.get_view(databox)
+
+    def render(self, view):
+        view.pagesize = sys.maxint
+        return len(view.folderitems())
+
+    def export_csv(self, view):
+        view.pagesize = sys.maxint
+        # the header is not a data row
+        return view.get_csv().count("\n") - 1
+
+    def export_excel(self, view):
+        view.pagesize = sys.maxint
+        view.get_excel()
+        return view.rows
+
+    def inflate_params(self, view, iterations):
+        for num in range(iterations):
+            view.inflate_params()
+        return iterations
+
+    def test_benchmark(self):
+        benchmark = self.benchmark
+
+        for query_type, columns in (("AnalysisRequest", SAMPLE_COLUMNS),
+                                    ("Analysis", ANALYSIS_COLUMNS)):
+            rows = self.expected[query_type]
+            view = self.get_view(query_type, columns)
+            result = benchmark.measure(
+                "{}:render".format(query_type), self.render, view)
+            self.assertEqual(result["rows"], rows)
+            view = self.get_view(query_type, columns)
+            result = benchmark.measure(
+                "{}:get_csv".format(query_type), self.export_csv, view)
+            self.assertEqual(result["rows"], rows)
+            view = self.get_view(query_type, columns)
+            result = benchmark.measure(
+                "{}:get_excel".format(query_type), self.export_excel, view)
+            self.assertEqual(result["rows"], rows)
+
+        # reference columns only
+        columns = filter(lambda c: c.values()[0].get("refs"), SAMPLE_COLUMNS)
+        view = self.get_view("AnalysisRequest", columns)
+        result = benchmark.measure(
+            "AnalysisRequest:reference_columns", self.render, view)
+        self.assertEqual(result["rows"], self.expected["AnalysisRequest"])
+
+        # parameter inflation
+        view = self.get_view("AnalysisRequest", SAMPLE_COLUMNS, PARAMS)
+        result = benchmark.measure(
+            "inflate_params", self.inflate_params, view, PARAMS_ITERATIONS)
+        self.assertEqual(result["rows"], PARAMS_ITERATIONS)
+
+
+class Record(object):
+    """Minimal catalogable record
+    """
+
+    def __init__(self, num):
+        self.num = num
+        self.portal_type = "AnalysisRequest"
+        # sort key with a low cardinality, like dates without time
+        self.created = num % 100
+
+
+class CountingCatalog(Catalog):
+    """Catalog that counts the instantiated brains
+    """
+
+    def __init__(self, *args, **kw):
+        Catalog.__init__(self, *args, **kw)
+        self.instantiated = 0
+
+    def instantiate(self, *args, **kw):
+        self.instantiated += 1
+        return Catalog.instantiate(self, *args, **kw)
+
+
+class TestSortLimit(unittest.TestCase):
+    """Sorting cost of the catalog with the databox sort limit
+
+    The cost is compared by the number of instantiated brains instead of the
+    wall time, which depends on the load of the machine.
+    """
+    level = 2
+
+    def get_catalog(self, size):
+        catalog = CountingCatalog()
+        catalog.addIndex("portal_type", FieldIndex("portal_type"))
+        catalog.addIndex("created", FieldIndex("created"))
+        catalog.addColumn("num")
+        for num in range(size):
+            catalog.catalogObject(Record(num), str(num))
+        return catalog
+
+    def count_brains(self, catalog, query):
+        """Returns the results and the number of brains to iterate them
+        """
+        catalog.instantiated = 0
+        results = catalog.searchResults(query)
+        list(results)
+        return results, catalog.instantiated
+
+    def test_sort_limit(self):
+        query = {
+            "portal_type": "AnalysisRequest",
+            "sort_on": "created",
+            "sort_limit": SORT_LIMIT,
+        }
+        full_query = dict(query)
+        del full_query["sort_limit"]
+        for size in SORT_SIZES:
+            catalog = self.get_catalog(size)
+
+            results, brains = self.count_brains(catalog, query)
+            self.assertEqual(len(results), SORT_LIMIT)
+            self.assertEqual(results.actual_result_count, size)
+            # the number of brains does not grow with the result size
+            self.assertEqual(brains, SORT_LIMIT)
+
+            results, brains = self.count_brains(catalog, full_query)
+            self.assertEqual(len(results), size)
+            self.assertEqual(brains, size)
+
+
+class CountingFormatter(DateFormatter):
+    """Date formatter that counts the formatted dates
+    """
+
+    def __init__(self, dfmt):
+        super(CountingFormatter, self).__init__(dfmt)
+        self.calls = 0
+
+    def format(self, value):
+        self.calls += 1
+        return super(CountingFormatter, self).format(value)
+
+
+class TestDateFormat(unittest.TestCase):
+    """Formatting cost of date columns
+
+    The cost is compared by the number of formatted dates instead of the
+    wall time, which depends on the load of the machine.
+    """
+    level = 2
+
+    def get_dates(self):
+        start = DateTime("2025/01/01 08:00")
+        return [start + (num % DATE_DISTINCT) for num in range(DATE_VALUES)]
+
+    def test_date_format(self):
+        values = self.get_dates()
+
+        def strftime(value):
+            return DT2dt(value).strftime(DATE_FORMAT)
+
+        # the compiled format does not convert the dates for strftime
+        formatter = CountingFormatter(DATE_FORMAT)
+        self.assertIsNotNone(formatter.template)
+        self.assertEqual(map(strftime, values), map(formatter.format, values))
+        self.assertEqual(formatter.calls, DATE_VALUES)
+
+        # every distinct date is formatted only once
+        memoized = CountingFormatter(DATE_FORMAT)
+        self.assertEqual(map(strftime, values), memoized.format_all(values))
+        self.assertEqual(memoized.calls, DATE_DISTINCT)
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestBenchmark))
+    suite.addTest(unittest.makeSuite(TestSortLimit))
+    suite.addTest(unittest.makeSuite(TestDateFormat))
+    return suite
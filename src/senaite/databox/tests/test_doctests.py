@@ -19,26 +19,53 @@
 # Some rights reserved, see README and LICENSE.
 
 import doctest
+from os.path import basename
 from os.path import join
 
 from pkg_resources import resource_listdir
 
 import unittest2 as unittest
+from senaite.databox.columnar import HAS_PYARROW
 from senaite.databox.config import PROJECTNAME
 from senaite.databox.tests.base import BaseTestCase
+from senaite.databox.tests.base import SamplesTestCase
 from Testing import ZopeTestCase as ztc
 
 # Option flags for doctests
 flags = doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE | doctest.REPORT_NDIFF
 
+# Doctests that use the samples generated by the samples layer
+SAMPLE_DOCTESTS = [
+    "Converters.rst",
+    "Delta.rst",
+    "Explain.rst",
+    "Parquet.rst",
+    "Pipeline.rst",
+    "Prefetch.rst",
+    "SQLite.rst",
+    "SlowLog.rst",
+    "Snapshot.rst",
+    "Streaming.rst",
+    "TypedExport.rst",
+    "Workbook.rst",
+]
+
+# Doctests that need optional packages and if they are installed
+OPTIONAL_DOCTESTS = {
+    "Parquet.rst": HAS_PYARROW,
+}
+
 
 def test_suite():
     suite = unittest.TestSuite()
     for doctestfile in get_doctest_files():
+        test_class = BaseTestCase
+        if basename(doctestfile) in SAMPLE_DOCTESTS:
+            test_class = SamplesTestCase
         suite.addTests([
             ztc.ZopeDocFileSuite(
                 doctestfile,
-                test_class=BaseTestCase,
+                test_class=test_class,
                 optionflags=flags
             )
         ])
@@ -50,4 +77,6 @@ def get_doctest_files():
     """
     files = resource_listdir(PROJECTNAME, "tests/doctests")
     files = filter(lambda file_name: file_name.endswith(".rst"), files)
+    files = filter(
+        lambda file_name: OPTIONAL_DOCTESTS.get(file_name, True), files)
     return map(lambda file_name: join("doctests", file_name), files)
@@ -19,10 +19,19 @@
 # Some rights reserved, see README and LICENSE.
 
 from bika.lims import api
+from senaite.core.api import catalog as capi
 from senaite.databox import logger
 
 PROFILE_ID = "profile-senaite.databox:default"
 
+# Indexes and metadata columns of the portal catalog, see catalog.xml
+CATALOG_INDEXES = [
+    ("query_type", "FieldIndex"),
+]
+CATALOG_COLUMNS = [
+    "query_type",
+]
+
 
 def run_all_upgradesteps(portal_setup):
     """Run all upgrade steps
@@ -33,23 +42,58 @@ def run_all_upgradesteps(portal_setup):
     logger.info("Run upgrade steps for SENAITE DATABOX ...")
     context = portal_setup._getImportContext(PROFILE_ID)
     portal = context.getSite()
-    portal_setup.runAllImportStepsFromProfile(PROFILE_ID)
+    # reimporting catalog.xml would clear the existing indexes
+    portal_setup.runAllImportStepsFromProfile(
+        PROFILE_ID, blacklisted_steps=["catalog"])
+    setup_catalog(portal)
     update_security_settings(portal)
+    reindex_databoxes(portal)
     logger.info("Run upgrade steps for SENAITE DATABOX [DONE]")
 
 
+def setup_catalog(portal):
+    """Add the missing indexes and metadata columns to the portal catalog
+    """
+    logger.info("Setup catalog ...")
+    catalog = api.get_tool("portal_catalog")
+    for index, index_type in CATALOG_INDEXES:
+        if capi.add_index(catalog, index, index_type):
+            logger.info("Added index {}".format(index))
+    for column in CATALOG_COLUMNS:
+        if capi.add_column(catalog, column):
+            logger.info("Added column {}".format(column))
+    logger.info("Setup catalog [DONE]")
+
+
+def get_objects(portal_type):
+    """Returns the objects of the given type wherever they are located
+    """
+    catalog = api.get_tool("portal_catalog")
+    brains = catalog.unrestrictedSearchResults(portal_type=portal_type)
+    return map(lambda brain: brain._unrestrictedGetObject(), brains)
+
+
 def update_security_settings(portal):
     """Update security settings for Databoxes
     """
     logger.info("Updating security settings for databoxes ...")
-    databoxes = portal.get("databoxes")
-    for databox in databoxes.objectValues():
+    for databox in get_objects("DataBox"):
         update_rolemappings_for(databox)
-    update_rolemappings_for(databoxes)
-    databoxes.reindexObject()
+    for folder in get_objects("DataBoxFolder"):
+        update_rolemappings_for(folder)
+        folder.reindexObject()
     logger.info("Updating security settings for databoxes [DONE]")
 
 
+def reindex_databoxes(portal):
+    """Reindex the databoxes for new catalog indexes and metadata
+    """
+    logger.info("Reindexing databoxes ...")
+    for databox in get_objects("DataBox"):
+        databox.reindexObject()
+    logger.info("Reindexing databoxes [DONE]")
+
+
 def update_rolemappings_for(context):
     """update rolemappings
     """
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.DATABOX.
+#
+# SENAITE.DATABOX is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import transaction
+from senaite.core.registry import get_registry_record
+from senaite.databox import logger
+from ZODB.POSException import ConflictError
+from ZODB.POSException import POSKeyError
+
+
+def get_setting(name, default=None):
+    """Returns the value of a databox registry setting
+
+    :param name: name of the field in `IDataBoxRegistry`
+    :param default: value to return if the record is missing or empty
+    """
+    value = get_registry_record(name, default=default)
+    if value is None:
+        return default
+    return value
+
+
+def commit_in_separate_transaction(obj, func, retries=3):
+    """Call the function with the object and commit in a separate transaction
+
+    This allows to write bookkeeping data, e.g. from a read-only (doomed)
+    listing request, without conflicting with the request transaction.
+
+    Objects that are not yet committed are modified in the current
+    transaction instead.
+
+    :param obj: persistent object to load in the separate connection
+    :param func: function that receives the object of the separate connection
+    :param retries: number of retries on conflict errors
+    :returns: True if the changes were committed
+    """
+    jar = getattr(obj, "_p_jar", None)
+    oid = getattr(obj, "_p_oid", None)
+    if jar is None or oid is None:
+        func(obj)
+        return False
+
+    db = jar.db()
+    for attempt in range(retries):
+        tm = transaction.TransactionManager()
+        connection = db.open(transaction_manager=tm)
+        try:
+            tm.begin()
+            try:
+                local = connection.get(oid)
+            except POSKeyError:
+                # object was created in the current transaction
+                tm.abort()
+                func(obj)
+                return False
+            func(local)
+            tm.commit()
+            return True
+        except ConflictError:
+            tm.abort()
+            logger.warn("Conflict error when writing to {} ({}/{})"
+                        .format(repr(obj), attempt + 1, retries))
+        except Exception:
+            tm.abort()
+            raise
+        finally:
+            connection.close()
+    return False